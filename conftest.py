@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache():
+    """Тот же свой файл кеша, что даёт тестам core.testing.TestRunner."""
+    from core.testing import isolated_cache
+    with isolated_cache():
+        yield
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает API v1 с HTML-страницами в запросах в секунду '
+        'на текущих данных (см. seed_content). Кеш страниц выключен, '
+        'фрагменты шаблонов кешируются как обычно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def _rate(self, client, url, count):
+        client.get(url)
+        start = time.perf_counter()
+        for _ in range(count):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return count / (time.perf_counter() - start)
+
+    @override_settings(DEBUG=False, PAGE_CACHE_TTL=0)
+    def handle(self, *args, **options):
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        author = User.objects.order_by('-profile__posts_count').first()
+        reader = User.objects.order_by('-profile__following_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        client = Client()
+        client.force_login(reader)
+        pairs = {
+            'index': ('posts:posts_list', 'api:posts', {}),
+            'group': ('posts:group_list', 'api:group_posts',
+                      {'slug': group.slug}),
+            'profile': ('posts:profile', 'api:profile_posts',
+                        {'username': author.username}),
+            'follow': ('posts:follow_index', 'api:follow', {}),
+            'post': ('posts:post_detail', 'api:post_detail',
+                     {'post_id': post.pk}),
+            'comments': ('posts:post_comments', 'api:post_comments',
+                         {'post_id': post.pk}),
+        }
+        count = options['requests']
+        self.stdout.write(f'{"":<10} {"HTML, зап/с":>12} {"API, зап/с":>12}')
+        for name, (html, api, kwargs) in pairs.items():
+            html_rate = self._rate(client, reverse(html, kwargs=kwargs), count)
+            api_rate = self._rate(client, reverse(api, kwargs=kwargs), count)
+            self.stdout.write(
+                f'{name:<10} {html_rate:>12.0f} {api_rate:>12.0f}')
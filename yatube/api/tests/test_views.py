@@ -0,0 +1,141 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group if i % 2 else None,
+                text=f'Пост {i}')
+            for i in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+            for i in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content)
+                          if response.streaming else response.content)
+
+    def walk(self, url, client=None, **params):
+        """id всех записей ленты, страница за страницей."""
+        ids = []
+        cursor = None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            data = self.get_json(url, client, **params)
+            ids += [item['id'] for item in data['results']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_feeds_are_cursor_paginated(self):
+        newest_first = [post.pk for post in reversed(self.posts)]
+        feeds = {
+            reverse('api:posts'): newest_first,
+            reverse('api:group_posts', kwargs={'slug': 'group'}): [
+                pk for pk in newest_first
+                if Post.objects.get(pk=pk).group_id],
+            reverse('api:profile_posts',
+                    kwargs={'username': 'author'}): newest_first,
+        }
+        for url, expected in feeds.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url, limit=2), expected)
+        self.assertEqual(
+            self.walk(reverse('api:follow'), self.reader_client, limit=2),
+            newest_first)
+
+    def test_post_serialization(self):
+        data = self.get_json(reverse('api:posts'), limit=1)
+        self.assertEqual(data['results'], [{
+            'id': self.post.pk,
+            'text': 'Пост 4',
+            'pub_date': data['results'][0]['pub_date'],
+            'author': {'username': 'author', 'full_name': 'Лев Толстой'},
+            'group': None,
+            'image': None,
+            'comments_count': 3,
+        }])
+        follow = self.get_json(
+            reverse('api:follow'), self.reader_client, limit=1)
+        self.assertEqual(follow['results'], data['results'])
+        detail = self.get_json(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(detail, data['results'][0])
+
+    def test_comments_newest_first(self):
+        url = reverse('api:post_comments', kwargs={'post_id': self.post.pk})
+        self.assertEqual(
+            self.walk(url, limit=2),
+            [comment.pk for comment in reversed(self.comments)])
+        data = self.get_json(url, limit=1)
+        self.assertEqual(data['results'][0]['author'], 'reader')
+
+    @override_settings(API_MAX_LIMIT=3)
+    def test_limit_is_capped(self):
+        data = self.get_json(reverse('api:posts'), limit=100)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_errors_are_json(self):
+        cases = {
+            reverse('api:follow'): HTTPStatus.UNAUTHORIZED,
+            reverse('api:group_posts', kwargs={'slug': 'missing'}):
+                HTTPStatus.NOT_FOUND,
+            reverse('api:post_detail', kwargs={'post_id': 0}):
+                HTTPStatus.NOT_FOUND,
+            reverse('api:posts') + '?cursor=broken': HTTPStatus.BAD_REQUEST,
+            reverse('api:posts') + '?limit=0': HTTPStatus.BAD_REQUEST,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_feed_query_count_is_constant(self):
+        url = reverse('api:posts')
+        with self.assertNumQueries(2):
+            self.get_json(url, limit=2)
+        Post.objects.create(author=self.reader, text='Ещё один')
+        with self.assertNumQueries(2):
+            self.get_json(url, limit=5)
+
+    def test_conditional_requests(self):
+        url = reverse('api:posts')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
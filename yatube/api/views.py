@@ -0,0 +1,212 @@
+"""API лент только для чтения, версия 1.
+
+Ответ ленты — {"results": [...], "next_cursor": ...}, следующая
+страница запрашивается по ?cursor=, размер — по ?limit=. Строки
+читаются через values() и пишутся в ответ по мере чтения, без
+шаблонов. Валидаторы ETag общие с HTML-страницами.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import etag, require_safe
+
+from core.pagination import NEXT, after, cursor_token, decode_cursor
+from posts.feeds import FollowFeed
+from posts.models import Comment, Group, Post, User
+from posts.views import (
+    group_etag, index_etag, page_etag, post_etag, profile_etag,
+)
+
+POST_FIELDS = (
+    'pk', 'text', 'pub_date', 'author__username', 'author__first_name',
+    'author__last_name', 'group__slug', 'group__title', 'image',
+    'image_width', 'image_height', 'comments_count',
+)
+COMMENT_FIELDS = ('pk', 'text', 'created', 'author__username')
+IMAGES = Post._meta.get_field('image').storage
+
+
+def _dumps(value):
+    return json.dumps(
+        value, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+
+def _error(detail, status):
+    return JsonResponse(
+        {'detail': detail}, status=status,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def serialize_post(row):
+    group = None
+    if row['group__slug']:
+        group = {'slug': row['group__slug'], 'title': row['group__title']}
+    image = None
+    if row['image']:
+        image = {
+            'url': IMAGES.url(str(row['image'])),
+            'width': row['image_width'],
+            'height': row['image_height'],
+        }
+    full_name = f'{row["author__first_name"]} {row["author__last_name"]}'
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': {
+            'username': row['author__username'],
+            'full_name': full_name.strip(),
+        },
+        'group': group,
+        'image': image,
+        'comments_count': row['comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def _stream(rows, limit, serialize, date_field):
+    """JSON страницы по частям; limit + 1-я строка даёт next_cursor."""
+    yield '{"results":['
+    last = None
+    for index, row in enumerate(rows):
+        if index == limit:
+            token = cursor_token(NEXT, last[date_field], last['pk'])
+            yield f'],"next_cursor":{_dumps(token)}}}'
+            return
+        if last is not None:
+            yield ','
+        yield _dumps(serialize(row))
+        last = row
+    yield '],"next_cursor":null}'
+
+
+def _page_params(request):
+    """(курсор, limit) из запроса или JsonResponse с ошибкой."""
+    token = request.GET.get('cursor')
+    cursor = decode_cursor(token) if token else None
+    if token and (cursor is None or cursor[0] != NEXT):
+        return _error('Неверный курсор.', 400)
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        return _error('limit должен быть числом.', 400)
+    if limit < 1:
+        return _error('limit должен быть больше нуля.', 400)
+    return cursor, min(limit, settings.API_MAX_LIMIT)
+
+
+def _page(request, queryset, serialize, date_field='pub_date'):
+    params = _page_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    cursor, limit = params
+    rows = after(queryset, cursor, date_field)[:limit + 1]
+    return StreamingHttpResponse(
+        _stream(rows.iterator(), limit, serialize, date_field),
+        content_type='application/json'
+    )
+
+
+@require_safe
+@etag(index_etag)
+def posts(request):
+    return _page(request, Post.objects.values(*POST_FIELDS), serialize_post)
+
+
+@require_safe
+@etag(group_etag)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return _error('Группа не найдена.', 404)
+    return _page(
+        request,
+        Post.objects.filter(group_id=group_id).values(*POST_FIELDS),
+        serialize_post
+    )
+
+
+@require_safe
+@etag(profile_etag)
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return _error('Пользователь не найден.', 404)
+    return _page(
+        request,
+        Post.objects.filter(author_id=author_id).values(*POST_FIELDS),
+        serialize_post
+    )
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return page_etag(request, (), FollowFeed(request.user).generation_key())
+
+
+@require_safe
+@etag(follow_etag)
+def follow(request):
+    """Лента подписок: порядок даёт FollowFeed, строки — values().
+
+    FollowFeed собирает посты из карточек с началом текста, а API
+    отдаёт текст целиком, так что строки дочитываются по id.
+    """
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация.', 401)
+    params = _page_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    cursor, limit = params
+    ids = [post.pk for post in FollowFeed(request.user).seek(
+        cursor, limit + 1)]
+    rows = {
+        row['pk']: row
+        for row in Post.objects.filter(pk__in=ids).values(*POST_FIELDS)
+    }
+    response = StreamingHttpResponse(
+        _stream((rows[pk] for pk in ids if pk in rows), limit,
+                serialize_post, 'pub_date'),
+        content_type='application/json'
+    )
+    response['Cache-Control'] = 'private'
+    return response
+
+
+@require_safe
+@etag(post_etag)
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if row is None:
+        return _error('Пост не найден.', 404)
+    return JsonResponse(
+        serialize_post(row), json_dumps_params={'ensure_ascii': False})
+
+
+@require_safe
+@etag(post_etag)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден.', 404)
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+        serialize_comment,
+        date_field='created'
+    )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'generation:'
+
+
+def _initial():
+    # Счётчик, потерянный кешем, не должен совпасть со старым значением,
+    # иначе под ним снова окажутся устаревшие фрагменты.
+    return int(time.time() * 1000)
+
+
+def generations(*namespaces):
+    """Текущие поколения пространств имён, недостающие заводятся."""
+    keys = [KEY_PREFIX + namespace for namespace in namespaces]
+    found = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def generation_key(*namespaces):
+    """Строка для ключа кеша, меняющаяся при bump любого из namespaces."""
+    return '.'.join(str(value) for value in generations(*namespaces))
+
+
+def bump(*namespaces):
+    """Сдвигает поколения, делая закешированное под ними недоступным."""
+    keys = [KEY_PREFIX + namespace for namespace in namespaces]
+    incr_many = getattr(cache, 'incr_many', None)
+    if incr_many is None:
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial(), None)
+        return
+    # SQLiteCache сдвигает все счётчики одной транзакцией; потерянные
+    # заводятся заново, новое начальное значение — тоже сдвиг.
+    bumped = incr_many(keys)
+    missing = {key: _initial() for key in keys if key not in bumped}
+    if missing:
+        cache.set_many(missing, None)
@@ -0,0 +1,85 @@
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.sqlite_cache import SQLiteCache
+
+
+def _hammer(backend, keys, repeat):
+    for _ in range(repeat):
+        backend.get_many(keys)
+        backend.incr('counter')
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает SQLiteCache с LocMemCache и FileBasedCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--processes', type=int, default=4)
+
+    def _time(self, name, operation, count, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - start) * 10 ** 6 / count)
+        self.stdout.write(
+            f'  {name:<20} {statistics.median(timings):>9.1f} мкс/ключ')
+
+    def _bench(self, backend, keys, repeat):
+        value = {'html': 'x' * 2000}
+        page = keys[:10]
+        self._time('set', lambda: [
+            backend.set(key, value) for key in keys], len(keys), repeat)
+        self._time('get', lambda: [
+            backend.get(key) for key in keys], len(keys), repeat)
+        self._time('get_many(10)', lambda: [
+            backend.get_many(page) for _ in range(len(keys) // 10)
+        ], len(keys), repeat)
+        backend.set('counter', 0)
+        self._time('incr', lambda: [
+            backend.incr('counter') for _ in keys], len(keys), repeat)
+
+    def _shared(self, backend, keys, processes, repeat):
+        backend.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_hammer, args=(backend, keys[:10], repeat))
+            for _ in range(processes)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'  {processes} процесса: incr {backend.get("counter")} '
+            f'из {processes * repeat}, {elapsed:.2f} с'
+        )
+
+    def handle(self, *args, **options):
+        keys = [f'bench:{i}' for i in range(options['keys'])]
+        directory = tempfile.mkdtemp()
+        params = {'OPTIONS': {'MAX_ENTRIES': len(keys) * 2}}
+        backends = {
+            'LocMemCache': LocMemCache('bench', params),
+            'FileBasedCache': FileBasedCache(f'{directory}/files', params),
+            'SQLiteCache': SQLiteCache(f'{directory}/cache.sqlite3', params),
+        }
+        try:
+            for name, backend in backends.items():
+                self.stdout.write(name)
+                self._bench(backend, keys, options['repeat'])
+                self._shared(
+                    backend, keys, options['processes'], options['keys'])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
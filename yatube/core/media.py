@@ -0,0 +1,153 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from .storage import is_hashed
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Файл, читаемый только в пределах [start, start + length).
+
+    fileno() и tell() остаются настоящими, так что wsgi.file_wrapper
+    gunicorn отдаёт диапазон через os.sendfile без копирования.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(path, stats):
+    if is_hashed(path):
+        return '"{}"'.format(os.path.splitext(os.path.basename(path))[0])
+    return '"{:x}-{:x}"'.format(stats.st_mtime_ns, stats.st_size)
+
+
+def _byte_range(request, etag, mtime, size):
+    """(start, length) из заголовка Range; None — отдать файл целиком.
+
+    Несколько диапазонов и устаревший If-Range тоже дают весь файл.
+    Диапазон, начинающийся за концом файла, возвращается как есть:
+    на него отвечают 416.
+    """
+    match = RANGE.match(request.META.get('HTTP_RANGE', ''))
+    if not match:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and (
+            parse_http_date_safe(if_range) != int(mtime)):
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = min(int(last), size)
+        return size - length, length
+    start = int(first)
+    if start >= size:
+        return start, 0
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+    return start, end - start + 1
+
+
+def _content_type(full_path):
+    return mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+
+def _accelerated(path, full_path):
+    # Длину и Range обрабатывает прокси.
+    response = HttpResponse(content_type=_content_type(full_path))
+    if settings.MEDIA_ACCEL == 'x-accel':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def _file_response(request, full_path, etag, stats):
+    size = stats.st_size
+    content_type = _content_type(full_path)
+    byte_range = _byte_range(request, etag, stats.st_mtime, size)
+    if byte_range and byte_range[0] >= size:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            FileRange(file, start, length), status=206,
+            content_type=content_type)
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}')
+        response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT без веб-сервера перед приложением.
+
+    Поддерживает условные запросы и Range; файлы с именем по хешу
+    содержимого кешируются навсегда. При MEDIA_ACCEL тело отдаёт
+    прокси: nginx по X-Accel-Redirect или Apache/lighttpd по X-Sendfile.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+    etag = _etag(path, stats)
+    last_modified = int(stats.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_ACCEL:
+            response = _accelerated(path, full_path)
+        else:
+            response = _file_response(request, full_path, etag, stats)
+        if response.status_code == 416:
+            return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_hashed(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
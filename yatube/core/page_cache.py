@@ -0,0 +1,84 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+
+from .generations import generation_key
+
+KEY_PREFIX = 'page:'
+
+
+def set_surrogate_keys(response, *keys, generation):
+    """Помечает ответ суррогатными ключами (пространствами поколений).
+
+    Только помеченные ответы попадают в кеш страниц; bump любого
+    из ключей делает такую страницу устаревшей. generation —
+    generation_key(*keys), прочитанный до сборки страницы: запись,
+    случившаяся во время рендера, тогда сбросит и эту копию.
+    """
+    response['Surrogate-Key'] = ' '.join(dict.fromkeys(keys))
+    response.surrogate_generation = generation
+    return response
+
+
+class AnonymousPageCacheMiddleware:
+    """Кеширует целиком GET-ответы для анонимных пользователей.
+
+    Запись хранит поколения своих суррогатных ключей и при чтении
+    сверяет их с текущими, так что запись сбрасывает ровно те
+    страницы, которые её показывают. Ставится после
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._is_cacheable_request(request):
+            response = self.get_response(request)
+            if response.has_header('Surrogate-Key'):
+                patch_cache_control(response, private=True)
+            return response
+        key = KEY_PREFIX + hashlib.md5(
+            request.get_full_path().encode()
+        ).hexdigest()
+        entry = cache.get(key)
+        if entry is not None:
+            surrogate_keys, generation, response = entry
+            if generation_key(*surrogate_keys) == generation:
+                return get_conditional_response(
+                    request, etag=response.get('ETag'), response=response)
+        response = self.get_response(request)
+        if self._is_cacheable_response(response):
+            surrogate_keys = response['Surrogate-Key'].split()
+            patch_vary_headers(response, ('Cookie',))
+            patch_cache_control(
+                response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE
+            )
+            response['Surrogate-Control'] = (
+                f'max-age={settings.PAGE_CACHE_TTL}'
+            )
+            cache.set(
+                key,
+                (surrogate_keys, response.surrogate_generation, response),
+                settings.PAGE_CACHE_TTL
+            )
+        return response
+
+    def _is_cacheable_request(self, request):
+        return (
+            settings.PAGE_CACHE_TTL > 0
+            and request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated
+        )
+
+    def _is_cacheable_response(self, response):
+        return (
+            response.status_code == 200
+            and response.has_header('Surrogate-Key')
+            and not response.streaming
+            and not response.cookies
+        )
@@ -1,8 +1,276 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
 from django.core.paginator import Paginator
+from django.db import OperationalError, connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+COUNT_KEY_PREFIX = 'pagination:count:'
+
+
+def encode_cursor(obj, direction=NEXT, date_field='pub_date'):
+    """Упаковывает ключ (дата, id) объекта в непрозрачный токен."""
+    return cursor_token(direction, getattr(obj, date_field), obj.pk)
+
+
+def cursor_token(direction, pub_date, pk):
+    raw = json.dumps([direction, pub_date.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для битого токена возвращает None."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode((token + padding).encode())
+        direction, pub_date, pk = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None
+    pub_date = parse_datetime(str(pub_date))
+    if (direction not in (NEXT, PREVIOUS) or pub_date is None
+            or not isinstance(pk, int)):
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница ленты без номера и без общего количества записей."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = ''
+        self.previous_cursor = ''
+        date_field = paginator.date_field
+        if object_list and has_next:
+            self.next_cursor = encode_cursor(
+                object_list[-1], NEXT, date_field
+            )
+        if object_list and has_previous:
+            self.previous_cursor = encode_cursor(
+                object_list[0], PREVIOUS, date_field
+            )
+
+    def __repr__(self):
+        return '<Cursor page of %s>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return bool(self.next_cursor)
+
+    def has_previous(self):
+        return bool(self.previous_cursor)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def seek(queryset, cursor, limit, date_field='pub_date', id_field='pk'):
+    """Keyset-выборка limit записей после курсора.
+
+    Для курсора назад записи возвращаются в обратном (возрастающем)
+    порядке, развернуть их должен вызывающий код.
+    """
+    return list(after(queryset, cursor, date_field, id_field)[:limit])
+
+
+def after(queryset, cursor, date_field='pub_date', id_field='pk'):
+    """Ленивая выборка записей после курсора в порядке обхода."""
+    if cursor is None:
+        return queryset.order_by('-' + date_field, '-' + id_field)
+    direction, pub_date, pk = cursor
+    if direction == NEXT:
+        return queryset.filter(
+            Q(**{date_field + '__lt': pub_date})
+            | Q(**{id_field + '__lt': pk}),
+            **{date_field + '__lte': pub_date}
+        ).order_by('-' + date_field, '-' + id_field)
+    return queryset.filter(
+        Q(**{date_field + '__gt': pub_date})
+        | Q(**{id_field + '__gt': pk}),
+        **{date_field + '__gte': pub_date}
+    ).order_by(date_field, id_field)
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (date_field, id) без COUNT(*) и OFFSET.
+
+    Кроме QuerySet принимает любую ленту с методом seek(cursor, limit).
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+
+    def seek(self, cursor, limit):
+        if hasattr(self.object_list, 'seek'):
+            return self.object_list.seek(cursor, limit)
+        return seek(self.object_list, cursor, limit, self.date_field)
+
+    def get_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        rows = self.seek(cursor, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if cursor is None:
+            return CursorPage(rows, self, has_more, False)
+        if cursor[0] == NEXT:
+            return CursorPage(rows, self, has_more, True)
+        return CursorPage(rows[::-1], self, True, has_more)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не пересчитывает COUNT(*) на каждый запрос.
+
+    Количество берётся из готового счётчика (count) либо из кеша
+    по ключу count_key, где живёт PAGINATION_COUNT_TTL секунд.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, count=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return self.object_list.count()
+        return cached_count(self.object_list, self.count_key)
+
+
+def cached_count(queryset, count_key):
+    """COUNT(*) выборки, закешированный на PAGINATION_COUNT_TTL секунд."""
+    key = COUNT_KEY_PREFIX + count_key
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_TTL)
+    return count
+
+
+def estimated_count(queryset):
+    """Число строк таблицы по статистике ANALYZE, без её просмотра.
+
+    None, если выборка отфильтрована, база не SQLite или ANALYZE
+    ещё не запускали.
+    """
+    connection = connections[queryset.db]
+    query = queryset.query
+    if connection.vendor != 'sqlite' or query.where or query.distinct:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+    except OperationalError:
+        return None
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Paginator для админки без COUNT(*) по всей таблице.
+
+    Нефильтрованный список считается по sqlite_stat1, отфильтрованный —
+    точно, с кешем по тексту запроса. Оценка может отставать от
+    таблицы до следующего ANALYZE.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        super().__init__(
+            object_list, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page
+        )
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None:
+            return estimate
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return cached_count(self.object_list, 'admin:' + digest)
+
+
+def page_window(number, last, on_each_side=None):
+    """Номера страниц вокруг текущей плюс первая и последняя.
+
+    Пропуски обозначены None, длина окна не зависит от длины ленты.
+    """
+    if on_each_side is None:
+        on_each_side = settings.PAGINATION_WINDOW
+    window = []
+    for page in (1, *range(number - on_each_side,
+                           number + on_each_side + 1), last):
+        if not 1 <= page <= last or (window and page <= window[-1]):
+            continue
+        if window and page > window[-1] + 1:
+            window.append(None)
+        window.append(page)
+    return window
+
 
+def pagination(request, post_list, count_key=None, count=None):
+    """Возвращает страницу ленты.
 
-def pagination(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+    Первые PAGINATION_NUMBERED_PAGES страниц отдаются нумерованным
+    CachedCountPaginator, глубже лента листается по ?cursor=.
+    """
+    token = request.GET.get('cursor')
+    if token is not None:
+        paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE)
+        page_obj = paginator.get_page(token)
+        page_obj.more_cursor = page_obj.next_cursor
+        return page_obj
+    if isinstance(post_list, QuerySet):
+        post_list = post_list.order_by('-pub_date', '-pk')
+    numbered_pages = settings.PAGINATION_NUMBERED_PAGES
+    paginator = CachedCountPaginator(
+        post_list, settings.POSTS_PER_PAGE, count_key=count_key, count=count
+    )
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    try:
+        page_number = min(int(page_number), numbered_pages)
+    except (TypeError, ValueError):
+        pass
+    page_obj = paginator.get_page(page_number)
+    page_obj.last_numbered = min(paginator.num_pages, numbered_pages)
+    page_obj.page_window = page_window(
+        page_obj.number, page_obj.last_numbered
+    )
+    # Курсор для подгрузки следующих карточек есть у любой страницы,
+    # в ссылки пагинатора он попадает только после нумерованных.
+    page_obj.more_cursor = ''
+    if page_obj.has_next():
+        page_obj.more_cursor = encode_cursor(page_obj[-1])
+    page_obj.next_cursor = ''
+    if page_obj.number >= numbered_pages:
+        page_obj.next_cursor = page_obj.more_cursor
+    return page_obj
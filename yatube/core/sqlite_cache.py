@@ -0,0 +1,270 @@
+"""Кеш в файле SQLite (WAL), общий для всех процессов на одном хосте."""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Ограничение SQLite на число параметров запроса в старых сборках.
+MAX_VARIABLES = 900
+# Сколько прочитанных ключей копить, прежде чем записать их время доступа.
+TOUCH_BATCH = 100
+# COUNT(*) — проход по всей таблице под общей блокировкой записи, поэтому
+# число строк сверяется с MAX_ENTRIES раз в MAX_ENTRIES // CULL_CHECK_SHARE
+# записанных строк: каждый процесс превышает лимит не больше чем на 0,1 %.
+CULL_CHECK_SHARE = 1000
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed)',
+)
+
+
+class SQLiteCache(BaseCache):
+    """LRU-кеш в файле LOCATION.
+
+    Процессы gunicorn видят одни и те же записи, incr атомарен между
+    ними. Чтение не пишет в файл: время доступа копится в процессе и
+    сбрасывается пачкой при ближайшей записи, поэтому LRU приблизительный.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._touched = {}
+        self._touched_lock = threading.Lock()
+        self._cull_check_every = max(1, self._max_entries // CULL_CHECK_SHARE)
+        self._unchecked = 0
+
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._flush_touched(connection)
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _encode(self, value):
+        # Целые храним как есть: счётчики поколений читаются без unpickle.
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        if isinstance(value, bytes):
+            return pickle.loads(value)
+        return value
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _touch_later(self, keys, now):
+        with self._touched_lock:
+            for key in keys:
+                self._touched[key] = now
+            full = len(self._touched) >= TOUCH_BATCH
+        if full:
+            with self._write():
+                pass
+
+    def _flush_touched(self, connection):
+        with self._touched_lock:
+            touched, self._touched = self._touched, {}
+        connection.executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ?',
+            [(accessed, key) for key, accessed in touched.items()]
+        )
+
+    def _fetch(self, connection, keys, now):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            rows = connection.execute(
+                'SELECT key, value FROM cache WHERE key IN ({}) '
+                'AND (expires IS NULL OR expires > ?)'.format(
+                    ', '.join('?' * len(chunk))),
+                chunk + [now]
+            )
+            found.update(rows)
+        return found
+
+    def _select(self, keys, now):
+        found = self._fetch(self._connection(), keys, now)
+        if found:
+            self._touch_later(found, now)
+        return found
+
+    def _set(self, connection, rows, now):
+        connection.executemany(
+            'REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            rows
+        )
+        # Счётчик меняется только под блокировкой записи.
+        self._unchecked += len(rows)
+        if self._unchecked < self._cull_check_every:
+            return
+        self._unchecked = 0
+        (count,) = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            self._cull(connection, count, now)
+
+    def _cull(self, connection, count, now):
+        count -= connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (now,)).rowcount
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,)
+        )
+
+    def _row(self, key, value, timeout, now):
+        return key, self._encode(value), self.get_backend_timeout(timeout), now
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._select([key], time.time())
+        if key not in found:
+            return default
+        return self._decode(found[key])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._select(keys, time.time())
+        return {
+            keys[key]: self._decode(value) for key, value in found.items()
+        }
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._select([key], time.time())
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            self._set(connection, [self._row(key, value, timeout, now)], now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self._write() as connection:
+            self._set(connection, rows, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            if self._live(connection, key, now):
+                return False
+            self._set(connection, [self._row(key, value, timeout, now)], now)
+        return True
+
+    def _live(self, connection, key, now):
+        return connection.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, now)
+        ).fetchone()
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = self._live(connection, key, now)
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (self._encode(value), now, key)
+            )
+        return value
+
+    def incr_many(self, keys, delta=1, version=None):
+        """incr нескольких ключей одной записью.
+
+        Возвращает новые значения; отсутствующие ключи пропускаются.
+        """
+        keys = {self._key(key, version): key for key in keys}
+        now = time.time()
+        with self._write() as connection:
+            found = self._fetch(connection, keys, now)
+            values = {
+                key: self._decode(value) + delta
+                for key, value in found.items()
+            }
+            connection.executemany(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                [(self._encode(value), now, key)
+                 for key, value in values.items()]
+            )
+        return {keys[key]: value for key, value in values.items()}
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now)
+            ).rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self._write() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def clear(self):
+        with self._touched_lock:
+            self._touched.clear()
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+CONTENT = b'0123456789' * 100
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+HASHED = f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg'
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ServeMediaTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in (HASHED, 'posts/flat.jpg'):
+            os.makedirs(os.path.join(MEDIA_ROOT, os.path.dirname(name)),
+                        exist_ok=True)
+            with open(os.path.join(MEDIA_ROOT, name), 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, name, **headers):
+        return self.client.get(f'/media/{name}', **headers)
+
+    def test_hashed_file_is_cached_forever(self):
+        response = self.get(HASHED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_conditional_requests(self):
+        response = self.get('posts/flat.jpg')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(
+            self.get('posts/flat.jpg', HTTP_IF_NONE_MATCH=etag).status_code,
+            304)
+        self.assertEqual(self.get(
+            'posts/flat.jpg',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+            304)
+
+    def test_ranges(self):
+        response = self.get(HASHED, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1000')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        response = self.get(HASHED, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+        response = self.get(HASHED, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1000')
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.get(
+            HASHED, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.get(
+            HASHED, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=f'"{DIGEST}"')
+        self.assertEqual(response.status_code, 206)
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.get('posts/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('posts').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+
+    @override_settings(MEDIA_ACCEL='x-accel')
+    def test_accel_redirect(self):
+        response = self.get(HASHED)
+        self.assertEqual(
+            response['X-Accel-Redirect'], f'/protected-media/{HASHED}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Last-Modified'], http_date(
+            int(os.stat(os.path.join(MEDIA_ROOT, HASHED)).st_mtime)))
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from .. import generations
+from ..sqlite_cache import SQLiteCache
+
+
+def _incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.dir, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_values_survive_roundtrip(self):
+        self.cache.set('int', 7)
+        self.cache.set('dict', {'a': [1, 2]})
+        self.cache.set('bool', True)
+        self.assertEqual(self.cache.get('int'), 7)
+        self.assertEqual(self.cache.get('dict'), {'a': [1, 2]})
+        self.assertIs(self.cache.get('bool'), True)
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_many_and_add(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        self.assertFalse(self.cache.add('a', 10))
+        self.assertTrue(self.cache.add('c', 3))
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set('short', 1, 0.05)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.add('short', 2))
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_many(self):
+        self.cache.set_many({'a': 1, 'b': 10})
+        self.assertEqual(
+            self.cache.incr_many(['a', 'b', 'missing']), {'a': 2, 'b': 11})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 2, 'b': 11})
+
+    def test_bump_writes_once(self):
+        self.cache._max_entries = 100
+        with mock.patch.object(generations, 'cache', self.cache):
+            before = generations.generations('a', 'b', 'c')
+            self.cache.delete(generations.KEY_PREFIX + 'c')
+            with mock.patch.object(
+                    self.cache, '_write', wraps=self.cache._write) as write:
+                generations.bump('a', 'b')
+            self.assertEqual(write.call_count, 1)
+            generations.bump('a', 'c')
+            self.assertTrue(
+                self.cache.has_key(generations.KEY_PREFIX + 'c'))
+            after = generations.generations('a', 'b')
+        self.assertEqual(after, [before[0] + 2, before[1] + 1])
+
+    def test_least_recently_used_is_evicted(self):
+        for key in 'abc':
+            self.cache.set(key, key)
+            time.sleep(0.01)
+        self.cache.get('a')
+        self.cache.set('d', 'd')
+        self.assertEqual(
+            set(self.cache.get_many('abcd')), {'a', 'c', 'd'})
+
+    def test_rows_are_counted_once_per_interval(self):
+        cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 2}})
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+        for i in range(25):
+            cache.set(f'key{i}', i)
+        counts = [sql for sql in statements if 'COUNT(*)' in sql]
+        self.assertEqual(len(counts), 2)
+        cache._max_entries = 20
+        cache.set_many({f'more{i}': i for i in range(10)})
+        self.assertLessEqual(len(cache.get_many(
+            [f'key{i}' for i in range(25)] + [f'more{i}' for i in range(10)]
+        )), 20)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_incr_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class DefaultCacheTests(SimpleTestCase):
+    """Тесты идут на SQLiteCache, но не на общем файле сервера."""
+
+    def test_default_cache_is_a_private_sqlite_file(self):
+        cache = caches['default']
+        self.assertIsInstance(cache, SQLiteCache)
+        self.assertNotEqual(
+            cache._path, os.path.join(settings.BASE_DIR, 'cache.sqlite3'))
+
+    def test_bump_goes_through_incr_many(self):
+        before = generations.generations('x', 'y')
+        with mock.patch.object(
+                caches['default'], 'incr', side_effect=AssertionError) as incr:
+            generations.bump('x', 'y')
+        incr.assert_not_called()
+        self.assertEqual(
+            generations.generations('x', 'y'),
+            [value + 1 for value in before])
@@ -1,9 +1,52 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from core.pagination import EstimatedCountPaginator
+
+from . import search
 from .models import Group, Post, Follow, Comment
 
 
-class PostAdmin(admin.ModelAdmin):
+class ScalableAdmin(admin.ModelAdmin):
+    """Список без COUNT(*) по всей таблице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое не ищет уже загруженный выбор в базе.
+
+    AutocompleteSelect достаёт выбранную группу запросом на каждую
+    строку списка; у строк changelist она уже есть из select_related.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or list(map(str, value)) != [str(selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        label = self.choices.field.label_from_instance(selected)
+        options.append(self.create_option(
+            name, selected.pk, label, True, len(options)))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        # RelatedFieldWidgetWrapper хранит сам виджет в .widget.
+        widget = getattr(widget, 'widget', widget)
+        if isinstance(widget, LoadedAutocompleteSelect):
+            widget.selected = (
+                self.instance.group if self.instance.group_id else None)
+
+
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,12 +55,60 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs.setdefault('widget', LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по FTS5-индексу вместо LIKE '%…%' по всей таблице.
+        if not search_term or not search.is_supported():
+            return super().get_search_results(
+                request, queryset, search_term)
+        if not search.match_expression(search_term):
+            return queryset.none(), False
+        sql, params = search.matching_ids_sql(search_term)
+        # pk__in=RawSQL(...) оборачивает подзапрос во вторые скобки,
+        # и SQL видит в нём скаляр: совпадал бы только первый пост.
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            where=[f'{table}.id IN ({sql})'], params=params), False
+
+
+class GroupAdmin(ScalableAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    date_hierarchy = 'created'
+    empty_value_display = '-пусто-'
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Follow)
-admin.site.register(Comment)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,190 @@
+"""Проекция PostCard: карточки постов для лент без join.
+
+Карточку пишет сигнал сохранения поста, имена автора и группы
+обновляют сигналы их моделей, миниатюры — генератор миниатюр.
+Ленты читают только карточки и получают из них несохранённые Post,
+так что шаблоны и курсоры у них те же, что у выборки постов.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.text import Truncator
+
+from core.pagination import seek
+from .models import Follow, Post, PostCard
+from .thumbnails import ready_variants, thumbnail_fields
+
+# Поля, которые check_cards сверяет с исходными таблицами.
+FIELDS = tuple(
+    field.attname for field in PostCard._meta.concrete_fields
+    if not field.primary_key
+)
+
+
+def excerpt(text):
+    return Truncator(text).chars(settings.POST_EXCERPT_LENGTH)
+
+
+def build(posts):
+    """Карточки для posts; author и group загружены."""
+    ready = ready_variants(post.image.name for post in posts if post.image)
+    return [
+        PostCard(
+            post_id=post.pk,
+            pub_date=post.pub_date,
+            author_id=post.author_id,
+            author_username=post.author.username,
+            author_full_name=post.author.get_full_name(),
+            group_id=post.group_id,
+            group_slug=post.group.slug if post.group_id else '',
+            group_title=post.group.title if post.group_id else '',
+            excerpt=excerpt(post.text),
+            image=post.image.name or '',
+            image_width=post.image_width,
+            image_height=post.image_height,
+            image_placeholder=post.image_placeholder,
+            comments_count=post.comments_count,
+            **thumbnail_fields(ready.get(post.image.name, {}))
+        )
+        for post in posts
+    ]
+
+
+def save_cards(posts):
+    """Создаёт или переписывает карточки posts.
+
+    Счётчик комментариев берётся из таблицы постов: в памяти он мог
+    устареть, а Post.save его не пишет.
+    """
+    cards = build(posts)
+    pks = [card.pk for card in cards]
+    with transaction.atomic():
+        PostCard.objects.filter(pk__in=pks).delete()
+        PostCard.objects.bulk_create(cards)
+        PostCard.objects.filter(pk__in=pks).update(comments_count=Subquery(
+            Post.objects.filter(pk=OuterRef('pk')).values('comments_count')
+        ))
+
+
+def repair(posts):
+    """Переписывает карточки posts в обход сигналов.
+
+    Возвращает пространства имён кеша, где видны и старые, и новые
+    карточки: группа в устаревшей карточке могла быть другой.
+    """
+    group_ids = set(PostCard.objects.filter(
+        pk__in=[post.pk for post in posts], group__isnull=False
+    ).values_list('group_id', flat=True))
+    save_cards(posts)
+    namespaces = {'index'}
+    for post in posts:
+        namespaces.update((f'post:{post.pk}', f'author:{post.author_id}'))
+        if post.group_id:
+            group_ids.add(post.group_id)
+    namespaces.update(f'group:{group_id}' for group_id in group_ids)
+    return namespaces | follower_namespaces(
+        {post.author_id for post in posts})
+
+
+def stale_cards(posts):
+    """(id постов без карточки, id постов с устаревшей карточкой)."""
+    stored = PostCard.objects.in_bulk([post.pk for post in posts])
+    missing, stale = [], []
+    for card in build(posts):
+        current = stored.get(card.pk)
+        if current is None:
+            missing.append(card.pk)
+        elif any(getattr(card, field) != getattr(current, field)
+                 for field in FIELDS):
+            stale.append(card.pk)
+    return missing, stale
+
+
+def batches(posts, batch_size):
+    """Посты пачками по pk, с загруженными author и group."""
+    posts = posts.select_related('author', 'group').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def follower_namespaces(author_ids):
+    """Пространства имён лент подписок читателей этих авторов."""
+    followers = Follow.objects.filter(
+        author_id__in=author_ids).values_list('user_id', flat=True)
+    return {f'follow:{user_id}' for user_id in set(followers)}
+
+
+def rename_author(user):
+    """Переименовывает автора в карточках.
+
+    Возвращает пространства имён кеша лент, где видны его посты.
+    """
+    cards = PostCard.objects.filter(author_id=user.pk)
+    cards.update(
+        author_username=user.username,
+        author_full_name=user.get_full_name()
+    )
+    group_ids = cards.filter(group__isnull=False).order_by().values_list(
+        'group_id', flat=True).distinct()
+    return {'index', f'author:{user.pk}'} | {
+        f'group:{group_id}' for group_id in group_ids
+    } | follower_namespaces([user.pk])
+
+
+def rename_group(group):
+    """Переименовывает группу в карточках.
+
+    Возвращает пространства имён кеша лент, где видны её посты.
+    """
+    cards = PostCard.objects.filter(group_id=group.pk)
+    cards.update(group_slug=group.slug, group_title=group.title)
+    author_ids = set(cards.order_by().values_list(
+        'author_id', flat=True).distinct())
+    return {'index', f'group:{group.pk}'} | {
+        f'author:{author_id}' for author_id in author_ids
+    } | follower_namespaces(author_ids)
+
+
+def detach_group(group):
+    """Убирает группу из карточек; возвращает пространства имён кеша."""
+    cards = PostCard.objects.filter(group_id=group.pk)
+    author_ids = set(cards.order_by().values_list(
+        'author_id', flat=True).distinct())
+    cards.update(group=None, group_slug='', group_title='')
+    return {'index'} | {
+        f'author:{author_id}' for author_id in author_ids
+    } | follower_namespaces(author_ids)
+
+
+def as_posts(cards):
+    return [card.as_post() for card in cards]
+
+
+class CardFeed:
+    """Лента из карточек для Paginator и CursorPaginator.
+
+    Как QuerySet, поддерживает срезы и count(), как FollowFeed —
+    seek(cursor, limit). Элементы — Post, собранные из карточек.
+    Сортировка по post_id, а не pk: pk карточки — связь с постом,
+    и order_by('pk') подтянул бы join с сортировкой Post.
+    """
+
+    def __init__(self, cards=None):
+        self.cards = PostCard.objects.all() if cards is None else cards
+
+    def seek(self, cursor, limit):
+        return as_posts(seek(self.cards, cursor, limit, id_field='post_id'))
+
+    def count(self):
+        return self.cards.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return as_posts(
+            self.cards.order_by('-pub_date', '-post_id')[index])
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .feeds import mark_heavy
+from .models import Comment, Follow, Post, PostCard, Profile
+
+User = get_user_model()
+
+
+def bump(user_id, **deltas):
+    """Атомарно сдвигает счётчики профиля: bump(1, posts_count=1)."""
+    Profile.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def bump_comments(post_id, delta):
+    for model in (Post, PostCard):
+        model.objects.filter(pk=post_id).update(
+            comments_count=F('comments_count') + delta
+        )
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('user_id')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def recount_profiles(profiles):
+    """Пересчитывает счётчики профилей по исходным таблицам."""
+    return profiles.update(
+        posts_count=_count(Post.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+
+
+def recount():
+    """Создаёт недостающие профили и пересчитывает все счётчики."""
+    Profile.objects.bulk_create(
+        [Profile(user_id=pk) for pk in User.objects.filter(
+            profile__isnull=True).values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    Post.objects.update(comments_count=Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField(),
+    ), 0))
+    PostCard.objects.update(comments_count=Subquery(
+        Post.objects.filter(pk=OuterRef('pk')).values('comments_count')
+    ))
+    profiles = recount_profiles(Profile.objects.all())
+    mark_heavy(Profile.objects.all())
+    return profiles
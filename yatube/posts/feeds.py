@@ -0,0 +1,145 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.generations import generation_key
+from core.pagination import NEXT, seek
+from .cards import CardFeed, as_posts
+from .models import Follow, Post, PostCard, Profile, Timeline
+
+HEAVY_AUTHORS_KEY = 'feeds:heavy_authors'
+
+
+def heavy_author_ids():
+    """Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT.
+
+    Их посты не раскладываются по лентам, а подмешиваются при чтении.
+    Автор, опустившийся ниже порога, остаётся здесь, пока ленты его
+    подписчиков не дозаполнит complete_timelines.
+    """
+    author_ids = cache.get(HEAVY_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(Profile.objects.filter(
+            Q(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+            | Q(timeline_complete=False)
+        ).values_list('user_id', flat=True))
+        cache.set(
+            HEAVY_AUTHORS_KEY, author_ids, settings.TIMELINE_HEAVY_AUTHORS_TTL
+        )
+    return author_ids
+
+
+def is_pushed(author_id):
+    return author_id not in heavy_author_ids()
+
+
+def push_author_posts(user_id, author_id):
+    """Кладёт все посты автора в ленту пользователя."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post_id=pk, author_id=author_id,
+                  pub_date=pub_date)
+         for pk, pub_date in posts.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def mark_heavy(profiles):
+    """Снимает timeline_complete у профилей выше порога подписчиков."""
+    return profiles.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        timeline_complete=True
+    ).update(timeline_complete=False)
+
+
+def complete_timelines(author_id):
+    """Раскладывает посты автора, вернувшегося под порог, по лентам.
+
+    Первый проход идёт, пока автор ещё подмешивается при чтении.
+    Посты и подписки, появившиеся до сброса кеша авторов, добирает
+    второй проход. Возвращает False, если автор снова выше порога.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        push_author_posts(user_id, author_id)
+    completed = Profile.objects.filter(
+        user_id=author_id,
+        followers_count__lte=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_complete=True)
+    if not completed:
+        return False
+    cache.delete(HEAVY_AUTHORS_KEY)
+    for user_id in followers.iterator():
+        push_author_posts(user_id, author_id)
+    return True
+
+
+def _post_key(post):
+    return post.pub_date, post.pk
+
+
+class FollowFeed:
+    """Лента подписок пользователя.
+
+    Посты обычных авторов читаются из Timeline (push), посты авторов
+    с большим числом подписчиков берутся прямо из карточек (pull).
+    Источники сливаются k-way merge по (pub_date, id), посты собираются
+    из карточек PostCard.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.pulled_ids = list(
+            Follow.objects.filter(
+                user=user, author_id__in=heavy_author_ids()
+            ).values_list('author_id', flat=True)
+        )
+
+    def generation_key(self):
+        """Версия ленты: поколение читателя и pull-авторов."""
+        return generation_key(
+            f'follow:{self.user.pk}',
+            *(f'author:{author_id}' for author_id in self.pulled_ids)
+        )
+
+    def _timeline(self):
+        return Timeline.objects.filter(user=self.user).exclude(
+            author_id__in=self.pulled_ids
+        )
+
+    def _pulled(self, author_id):
+        return PostCard.objects.filter(author_id=author_id)
+
+    def _sources(self, cursor, limit):
+        post_ids = seek(
+            self._timeline().values_list('post_id', flat=True),
+            cursor, limit, id_field='post_id'
+        )
+        cards = PostCard.objects.in_bulk(post_ids)
+        yield as_posts(cards[pk] for pk in post_ids if pk in cards)
+        for author_id in self.pulled_ids:
+            yield CardFeed(self._pulled(author_id)).seek(cursor, limit)
+
+    def seek(self, cursor, limit):
+        reverse = cursor is None or cursor[0] == NEXT
+        merged = heapq.merge(
+            *self._sources(cursor, limit), key=_post_key, reverse=reverse
+        )
+        return list(islice(merged, limit))
+
+    def count(self):
+        return self._timeline().count() + sum(
+            self._pulled(author_id).count() for author_id in self.pulled_ids
+        )
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return self.seek(None, index.stop)[index.start or 0:]
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import ingest
 from .models import Comment, Post
 
 
@@ -9,6 +11,14 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        # Размеры и заглушку мастера запишет при сохранении сигнал
+        # describe_image, взяв их из атрибутов результата ingest.
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image = ingest(image)
+        return image
+
 
 class CommentForm(ModelForm):
 
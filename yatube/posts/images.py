@@ -0,0 +1,144 @@
+import base64
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFilter, ImageOps
+
+# Размер заглушки: пропорции карточки 960x339.
+PLACEHOLDER_SIZE = (32, 11)
+# Строк мастера за один проход ресемплинга.
+RESIZE_BAND_ROWS = 64
+# Ориентации EXIF, при которых кадр поворачивается на 90°.
+TRANSPOSED = {5, 6, 7, 8}
+
+
+def check_upload(upload):
+    """Проверяет размер файла и число пикселей по заголовку, не декодируя."""
+    if upload.size > settings.IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            params={'limit': settings.IMAGE_MAX_BYTES // 2 ** 20},
+            code='image_too_large'
+        )
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)d мегапикселей.',
+            params={'limit': settings.IMAGE_MAX_PIXELS // 10 ** 6},
+            code='image_too_many_pixels'
+        )
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def placeholder(image):
+    """Крошечная размытая копия кадра карточки в виде data URI."""
+    small = ImageOps.fit(image.convert('RGB'), PLACEHOLDER_SIZE)
+    buffer = BytesIO()
+    small.filter(ImageFilter.GaussianBlur(1)).save(
+        buffer, 'JPEG', quality=40, optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def describe(content):
+    """(ширина, высота, заглушка) картинки с учётом поворота из EXIF.
+
+    У мастер-копии из ingest всё уже посчитано. Остальные файлы
+    (админка, старые посты) для заглушки декодируются черновиком.
+    """
+    if hasattr(content, 'placeholder'):
+        return content.width, content.height, content.placeholder
+    content.seek(0)
+    with Image.open(content) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+        if image.format == 'JPEG':
+            image.draft(None, (PLACEHOLDER_SIZE[0] * 4,) * 2)
+        return width, height, placeholder(ImageOps.exif_transpose(image))
+
+
+def shrink(image, limit):
+    """Уменьшает image до limit по большей стороне, LANCZOS.
+
+    Image.resize держит промежуточный буфер ширины результата на всю
+    высоту исходника — для 12 Мп это ещё половина декодированного
+    кадра. Ресемплинг полосами через box даёт те же пиксели с
+    точностью до округления, а буфер нужен лишь на полосу.
+    """
+    width, height = image.size
+    ratio = limit / max(width, height)
+    if ratio >= 1:
+        return image
+    size = (max(round(width * ratio), 1), max(round(height * ratio), 1))
+    if image.mode in ('1', 'P'):
+        return image.resize(size, Image.NEAREST)
+    # RGBA resize сам переводит в RGBa, но целиком на каждую полосу.
+    premultiplied = image.mode in ('LA', 'RGBA')
+    if premultiplied:
+        image = image.convert(image.mode[:-1] + 'a')
+    scale = height / size[1]
+    result = Image.new(image.mode, size)
+    for top in range(0, size[1], RESIZE_BAND_ROWS):
+        bottom = min(top + RESIZE_BAND_ROWS, size[1])
+        result.paste(image.resize(
+            (size[0], bottom - top), Image.LANCZOS,
+            box=(0, top * scale, width, bottom * scale)
+        ), (0, top))
+    if premultiplied:
+        result = result.convert(result.mode[:-1] + 'A')
+    return result
+
+
+def ingest(upload):
+    """Превращает загрузку в мастер-копию не больше IMAGE_MASTER_SIZE.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поворот
+    из EXIF применяется к пикселям. Картинки с прозрачностью остаются
+    PNG, остальные сохраняются прогрессивным JPEG. Размеры мастера
+    и заглушка для страницы лежат в атрибутах width, height и
+    placeholder результата.
+    """
+    check_upload(upload)
+    limit = settings.IMAGE_MASTER_SIZE
+    upload.seek(0)
+    buffer = BytesIO()
+    with Image.open(upload) as image:
+        if image.format == 'JPEG':
+            image.draft(None, (limit, limit))
+        # Уменьшаем до поворота: квадратной рамке он безразличен,
+        # а копия при повороте выходит уже маленькой.
+        small = shrink(image, limit)
+        if small is not image:
+            # exif_transpose берёт EXIF из info, resize его не копирует.
+            small.info = image.info
+            image.close()
+        image = ImageOps.exif_transpose(small)
+    if _has_alpha(image):
+        extension, content_type = 'png', 'image/png'
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        extension, content_type = 'jpg', 'image/jpeg'
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(
+            buffer, 'JPEG', quality=settings.IMAGE_MASTER_QUALITY,
+            progressive=True, optimize=True
+        )
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    master = SimpleUploadedFile(
+        f'{stem}.{extension}', buffer.getvalue(), content_type=content_type
+    )
+    master.width, master.height = image.size
+    master.placeholder = placeholder(image)
+    return master
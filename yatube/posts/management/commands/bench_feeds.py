@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.pagination import NEXT, seek
+from posts.feeds import FollowFeed
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Замеряет запросы лент на текущих данных (см. seed_content).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--per-page', type=int, default=10)
+
+    def _time(self, name, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f'{name:<32} {statistics.median(timings):>9.2f} ms'
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        limit = options['per_page']
+        feed = Post.objects.order_by('-pub_date', '-pk')
+        total = feed.count()
+        middle = feed[total // 2]
+        cursor = (NEXT, middle.pub_date, middle.pk)
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        author = User.objects.order_by('-profile__posts_count').first()
+        reader = User.objects.order_by('-profile__following_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        queries = {
+            'index, первая страница': lambda: list(feed[:limit]),
+            'index, OFFSET середины': lambda: list(
+                feed[total // 2:total // 2 + limit]),
+            'index, курсор середины': lambda: seek(
+                Post.objects.all(), cursor, limit),
+            'group': lambda: list(
+                feed.filter(group=group)[:limit]),
+            'profile': lambda: list(
+                feed.filter(author=author)[:limit]),
+            'follow, JOIN Follow': lambda: list(
+                feed.filter(author__following__user=reader)[:limit]),
+            'follow, Timeline': lambda: FollowFeed(reader).seek(
+                None, limit),
+            'comments поста': lambda: list(
+                Comment.objects.filter(post=post).order_by('created')),
+            'подписка exists()': lambda: Follow.objects.filter(
+                user=reader, author=author).exists(),
+        }
+        self.stdout.write(f'Постов: {total}, повторов: {repeat}')
+        for name, query in queries.items():
+            self._time(name, query, repeat)
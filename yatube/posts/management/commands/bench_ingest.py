@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.images import ingest
+
+
+def _make_photo(path, megapixels):
+    width = int((megapixels * 10 ** 6 * 4 / 3) ** 0.5)
+    image = Image.radial_gradient('L').resize((width, width * 3 // 4))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    image.convert('RGB').save(path, 'JPEG', quality=90, exif=exif.tobytes())
+
+
+def _naive(path):
+    with open(path, 'rb') as file:
+        with Image.open(file) as image:
+            image.load()
+
+
+def _ingest(path):
+    with open(path, 'rb') as file:
+        ingest(SimpleUploadedFile('photo.jpg', file.read()))
+
+
+def _idle(path):
+    pass
+
+
+def _measure(target, path, queue):
+    target(path)
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет пиковую память процесса на одну загрузку картинки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--megapixels', type=int, nargs='+', default=[12, 24, 48])
+
+    def _peak(self, target, path):
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=_measure, args=(target, path, queue))
+        process.start()
+        peak = queue.get()
+        process.join()
+        return peak
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'photo.jpg')
+        try:
+            baseline = self._peak(_idle, path)
+            self.stdout.write(
+                f'{"МП":>4} {"файл, МБ":>9} {"load(), МБ":>11} '
+                f'{"ingest, МБ":>11}'
+            )
+            for megapixels in options['megapixels']:
+                # Фото собирается в отдельном процессе, чтобы не раздуть
+                # память родителя, от которой стартуют замеры.
+                process = multiprocessing.get_context('fork').Process(
+                    target=_make_photo, args=(path, megapixels))
+                process.start()
+                process.join()
+                naive = self._peak(_naive, path) - baseline
+                ingested = self._peak(_ingest, path) - baseline
+                self.stdout.write(
+                    f'{megapixels:>4} {os.path.getsize(path) / 2 ** 20:>9.1f} '
+                    f'{naive / 1024:>11.1f} {ingested / 1024:>11.1f}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.generations import bump
+from posts import cards
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет карточки постов с постами, авторами и группами. '
+        'Без --fix расхождения только выводятся, и команда завершается '
+        'с ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Переписать недостающие и устаревшие карточки.'
+        )
+
+    def handle(self, *args, **options):
+        checked = missing = stale = 0
+        for batch in cards.batches(Post.objects.all(), options['batch_size']):
+            batch_missing, batch_stale = cards.stale_cards(batch)
+            for pk in batch_missing:
+                self.stdout.write(f'Пост {pk}: нет карточки')
+            for pk in batch_stale:
+                self.stdout.write(f'Пост {pk}: карточка устарела')
+            broken = set(batch_missing) | set(batch_stale)
+            if options['fix'] and broken:
+                bump(*cards.repair(
+                    [post for post in batch if post.pk in broken]))
+            checked += len(batch)
+            missing += len(batch_missing)
+            stale += len(batch_stale)
+        summary = (
+            f'Проверено постов: {checked}, без карточки: {missing}, '
+            f'устаревших: {stale}.'
+        )
+        if (missing or stale) and not options['fix']:
+            raise CommandError(summary)
+        if missing or stale:
+            summary += ' Исправлено.'
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,64 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+
+from core.generations import bump
+from posts import cards
+from posts.images import describe
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает размеры и заглушку картинкам постов, у которых их '
+        'нет: загруженным до их появления, через админку или update(). '
+        'Работает пачками, можно прерывать и запускать снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def _describe(self, post, storage):
+        name = post.image.name
+        try:
+            with storage.open(name) as content:
+                width, height, placeholder = describe(content)
+        except (OSError, SuspiciousFileOperation) as error:
+            self.stderr.write(f'Пост {post.pk}: {name}: {error}')
+            return False
+        # Условие на имя: картинку могли заменить, пока мы её читали.
+        return Post.objects.filter(pk=post.pk, image=name).update(
+            image_width=width, image_height=height,
+            image_placeholder=placeholder) == 1
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        posts = Post.objects.exclude(image='').filter(
+            image_width__isnull=True).order_by('pk').only(
+            'pk', 'image', 'author_id', 'group_id')
+        last_pk = 0
+        described = failed = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            done = [post for post in batch if self._describe(post, storage)]
+            failed += len(batch) - len(done)
+            described += len(done)
+            if not done:
+                continue
+            # update() не шлёт сигналов: карточки и кеш страниц — сами.
+            cards.save_cards(list(Post.objects.select_related(
+                'author', 'group').filter(pk__in=[p.pk for p in done])))
+            namespaces = {'index'}
+            for post in done:
+                namespaces.update(
+                    (f'post:{post.pk}', f'author:{post.author_id}'))
+                if post.group_id:
+                    namespaces.add(f'group:{post.group_id}')
+            namespaces |= cards.follower_namespaces(
+                {post.author_id for post in done})
+            bump(*namespaces)
+            self.stdout.write(f'До поста {last_pk}: описано {described}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Описано {described}, не прочитано {failed}.'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import dump, export_records, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в JSONL (файл на .gz сжимается). Файлы картинок не копируются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        start = time.perf_counter()
+        total = 0
+        with open_stream(options['path'], 'w') as stream:
+            for record in export_records(chunk_size):
+                stream.write(dump(record) + '\n')
+                total += 1
+                if total % (chunk_size * 10) == 0:
+                    self._progress(total, start)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {self._rate(total, start)}.'))
+
+    def _rate(self, total, start):
+        elapsed = time.perf_counter() - start
+        return f'{total} строк, {total / max(elapsed, 1e-9):.0f} строк/с'
+
+    def _progress(self, total, start):
+        self.stdout.write(f'Выгружено {self._rate(total, start)}')
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.feeds import complete_timelines
+from posts.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, какие авторы раскладываются по лентам (push), '
+        'а какие подмешиваются при чтении (pull).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько авторов с наибольшим числом подписчиков показать.'
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Разложить по лентам посты авторов, которые вернулись '
+                 'под порог; до этого они подмешиваются при чтении.'
+        )
+
+    def handle(self, *args, **options):
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        authors = Profile.objects.filter(followers_count__gt=0)
+        pulled = authors.filter(followers_count__gt=limit).count()
+        waiting = Profile.objects.filter(
+            timeline_complete=False, followers_count__lte=limit)
+        near = authors.filter(
+            followers_count__gt=limit // 2, followers_count__lte=limit
+        ).count()
+        self.stdout.write(f'Порог подписчиков: {limit}')
+        self.stdout.write(f'Pull-авторов (выше порога): {pulled}')
+        self.stdout.write(f'Push-авторов на подходе (50-100%): {near}')
+        self.stdout.write(f'Push-авторов всего: {authors.count() - pulled}')
+        self.stdout.write(f'Ждут дозаполнения лент: {waiting.count()}')
+        top = authors.select_related('user').order_by('-followers_count')
+        for profile in top[:options['top']]:
+            followers = profile.followers_count
+            mode = 'push'
+            if followers > limit or not profile.timeline_complete:
+                mode = 'pull'
+            self.stdout.write(
+                f'{profile.user.username:<30} {followers:>10} '
+                f'{followers * 100 // max(limit, 1):>6}% {mode}'
+            )
+        if options['backfill']:
+            completed = 0
+            for author_id in waiting.values_list('user_id', flat=True):
+                completed += complete_timelines(author_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Ленты дозаполнены, авторов: {completed}.'))
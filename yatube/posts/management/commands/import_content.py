@@ -0,0 +1,103 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.generations import bump
+from posts.counters import recount
+from posts.models import Comment, Post
+from posts.transfer import Importer, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает файл export_content пачками bulk_create. Прогресс '
+        'пишется в файл состояния после каждой пачки: прерванный импорт '
+        'продолжается с того же места, повторный ничего не дублирует.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--state',
+            help='Файл состояния, по умолчанию <path>.state.'
+        )
+
+    def _load_state(self, path):
+        if os.path.exists(path):
+            with open(path) as file:
+                state = json.load(file)
+            self.stdout.write(f'Продолжаем со строки {state["line"]}.')
+            return state
+        # Исходные id постов и комментариев сдвигаются за максимум
+        # целевой базы: ссылки сохраняются без таблицы соответствия.
+        return {
+            'line': 0,
+            'post_offset': Post.objects.aggregate(m=Max('pk'))['m'] or 0,
+            'comment_offset': (
+                Comment.objects.aggregate(m=Max('pk'))['m'] or 0),
+        }
+
+    def _save_state(self, path, state):
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(state, file)
+        os.replace(temporary, path)
+
+    def _flush(self, importer, model, batch, state):
+        with transaction.atomic():
+            namespaces = importer.save(model, batch)
+        state['line'] += len(batch)
+        self._save_state(self.state_path, state)
+        bump(*namespaces)
+
+    def handle(self, *args, **options):
+        self.state_path = options['state'] or options['path'] + '.state'
+        state = self._load_state(self.state_path)
+        importer = Importer(state['post_offset'], state['comment_offset'])
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        total = 0
+        batch = []
+        model = None
+        with open_stream(options['path'], 'r') as stream:
+            for line in islice(stream, state['line'], None):
+                record = json.loads(line)
+                if batch and (record['model'] != model
+                              or len(batch) >= batch_size):
+                    self._flush(importer, model, batch, state)
+                    total += len(batch)
+                    self._progress(model, total, start)
+                    batch = []
+                model = record.pop('model')
+                batch.append(record)
+        if batch:
+            self._flush(importer, model, batch, state)
+            total += len(batch)
+        self._reset_sequences()
+        recount()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк, {total / max(elapsed, 1e-9):.0f} '
+            f'строк/с, пропущено {importer.skipped}.'
+        ))
+
+    def _progress(self, model, total, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{model}: {total} строк, {total / max(elapsed, 1e-9):.0f} строк/с'
+        )
+
+    def _reset_sequences(self):
+        # Явные id не двигают последовательности PostgreSQL.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.generations import bump
+from posts import cards
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переписывает карточки постов для лент пачками. Нужна после '
+        'записей в обход сигналов (bulk_create, update()).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for batch in cards.batches(Post.objects.all(), options['batch_size']):
+            bump(*cards.repair(batch))
+            total += len(batch)
+            self.stdout.write(f'Карточек: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, постов: {total}.'))
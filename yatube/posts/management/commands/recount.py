@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def handle(self, *args, **options):
+        profiles = recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано профилей: {profiles}')
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет поисковый индекс постов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Сначала очистить индекс (например, после bulk_create).'
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Поиск работает только на SQLite с FTS5.')
+        if options['clear']:
+            search.clear()
+        posts = Post.objects.select_related('author', 'group').order_by('pk')
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                search.index_posts(batch)
+            last_pk = batch[-1].pk
+            total += len(batch)
+            self.stdout.write(f'Проиндексировано: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, постов: {total}.'))
@@ -0,0 +1,86 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import cards
+from posts.counters import recount
+from posts.feeds import push_author_posts
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на одного пользователя.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _bulk(self, model, objects, batch_size):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = f'seed{rnd.randrange(10 ** 6)}'
+        self._bulk(User, (
+            User(username=f'{prefix}_user{i}', first_name=f'Имя{i}')
+            for i in range(options['users'])
+        ), batch_size)
+        self._bulk(Group, (
+            Group(title=f'Группа {i}', slug=f'{prefix}-group{i}',
+                  description='Описание')
+            for i in range(options['groups'])
+        ), batch_size)
+        user_ids = list(User.objects.filter(
+            username__startswith=prefix).values_list('pk', flat=True))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=prefix).values_list('pk', flat=True))
+        self._bulk(Post, (
+            Post(author_id=rnd.choice(user_ids),
+                 group_id=rnd.choice(group_ids + [None]),
+                 text=f'Пост {i} ' * 20)
+            for i in range(options['posts'])
+        ), batch_size)
+        post_ids = list(Post.objects.filter(
+            author_id__in=user_ids).values_list('pk', flat=True))
+        self._bulk(Comment, (
+            Comment(post_id=rnd.choice(post_ids),
+                    author_id=rnd.choice(user_ids),
+                    text=f'Комментарий {i}')
+            for i in range(options['comments'])
+        ), batch_size)
+        follows = {
+            (user_id, author_id)
+            for user_id in user_ids
+            for author_id in rnd.sample(
+                user_ids, min(options['follows'], len(user_ids)))
+            if author_id != user_id
+        }
+        self._bulk(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in follows
+        ), batch_size)
+        for user_id, author_id in follows:
+            push_author_posts(user_id, author_id)
+        recount()
+        for batch in cards.batches(
+                Post.objects.filter(author_id__in=user_ids), batch_size):
+            cards.save_cards(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(user_ids)} пользователей, {len(post_ids)} '
+            f'постов, {len(follows)} подписок.'
+        ))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+
+from core.generations import bump
+from core.storage import is_hashed
+from posts import cards
+from posts.models import Follow, Post
+from posts.thumbnails import queue_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с именами по хешу '
+        'содержимого. Работает пачками на живой базе, можно прерывать '
+        'и запускать снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалять старые файлы, на которые больше не ссылаются посты.'
+        )
+
+    def _migrate(self, post, storage, delete):
+        old = post.image.name
+        if not storage.exists(old):
+            self.stderr.write(f'Пост {post.pk}: нет файла {old}')
+            return None
+        with storage.open(old) as content:
+            new = storage.save(old, content)
+        # Условие на старое имя: пост, отредактированный в процессе,
+        # не откатывается к устаревшей картинке.
+        if not Post.objects.filter(pk=post.pk, image=old).update(image=new):
+            return None
+        if delete and not Post.objects.filter(image=old).exists():
+            storage.delete(old)
+        queue_thumbnails(new)
+        cards.save_cards(list(Post.objects.select_related(
+            'author', 'group').filter(pk=post.pk)))
+        return new
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        posts = Post.objects.exclude(image='').order_by('pk').only(
+            'pk', 'image', 'author_id', 'group_id')
+        last_pk = 0
+        moved = skipped = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            namespaces = set()
+            authors = set()
+            for post in batch:
+                if is_hashed(post.image.name):
+                    continue
+                if self._migrate(post, storage, options['delete']) is None:
+                    skipped += 1
+                    continue
+                moved += 1
+                authors.add(post.author_id)
+                namespaces.update((f'post:{post.pk}',
+                                   f'author:{post.author_id}'))
+                if post.group_id:
+                    namespaces.add(f'group:{post.group_id}')
+            if namespaces:
+                # update() не шлёт сигналов, закешированные страницы
+                # со старыми URL сбрасываем сами.
+                followers = Follow.objects.filter(
+                    author_id__in=authors).values_list('user_id', flat=True)
+                namespaces.update(
+                    f'follow:{user_id}' for user_id in set(followers))
+                bump('index', *namespaces)
+            self.stdout.write(f'До поста {last_pk}: перенесено {moved}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено {moved}, пропущено {skipped}.'))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    if not has_fts5(schema_editor.connection):
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+        "text, group_title, author_name, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Совпадение в группе или имени автора весит больше, чем в тексте.
+    schema_editor.execute(
+        "INSERT INTO posts_post_search (posts_post_search, rank) "
+        "VALUES ('rank', 'bm25(1.0, 2.0, 2.0)')"
+    )
+    fill_search_index(apps, schema_editor)
+
+
+def fill_search_index(apps, schema_editor):
+    # То же, что search.index_posts: имя автора — username и полное имя.
+    post = apps.get_model('posts', 'Post')._meta.db_table
+    group = apps.get_model('posts', 'Group')._meta.db_table
+    user = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    full_name = "TRIM(u.first_name || ' ' || u.last_name)"
+    schema_editor.execute(
+        'INSERT INTO posts_post_search '
+        '(rowid, text, group_title, author_name) '
+        "SELECT p.id, p.text, COALESCE(g.title, ''), "
+        f"u.username || CASE WHEN {full_name} = '' THEN '' "
+        f"ELSE ' ' || {full_name} END "
+        f'FROM {post} p JOIN {user} u ON u.id = p.author_id '
+        f'LEFT JOIN {group} g ON g.id = p.group_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if has_fts5(schema_editor.connection):
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.text import Truncator
+
+
+def fill_cards(apps, schema_editor):
+    # Поля карточки — как в posts.cards.build, но по историческим
+    # моделям. Готовые миниатюры ищутся в хранилище sorl, а не
+    # в таблицах posts, поэтому для них годится код приложения.
+    from posts.thumbnails import ready_variants, thumbnail_fields
+    Post = apps.get_model('posts', 'Post')
+    PostCard = apps.get_model('posts', 'PostCard')
+    posts = Post.objects.select_related('author', 'group').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        ready = ready_variants(
+            post.image.name for post in batch if post.image)
+        PostCard.objects.bulk_create(
+            PostCard(
+                post_id=post.pk,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                author_username=post.author.username,
+                author_full_name='{} {}'.format(
+                    post.author.first_name, post.author.last_name).strip(),
+                group_id=post.group_id,
+                group_slug=post.group.slug if post.group_id else '',
+                group_title=post.group.title if post.group_id else '',
+                excerpt=Truncator(post.text).chars(
+                    settings.POST_EXCERPT_LENGTH),
+                image=post.image.name or '',
+                image_width=post.image_width,
+                image_height=post.image_height,
+                image_placeholder=post.image_placeholder,
+                comments_count=post.comments_count,
+                **thumbnail_fields(ready.get(post.image.name, {}))
+            )
+            for post in batch
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_comment_created_index'),
+        ('thumbnail', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCard',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author_username', models.CharField(max_length=150, verbose_name='Имя пользователя')),
+                ('author_full_name', models.CharField(blank=True, max_length=300, verbose_name='Полное имя автора')),
+                ('group_slug', models.CharField(blank=True, max_length=100, verbose_name='Slug группы')),
+                ('group_title', models.CharField(blank=True, max_length=200, verbose_name='Название группы')),
+                ('excerpt', models.TextField(verbose_name='Начало текста')),
+                ('image', models.CharField(blank=True, max_length=100, verbose_name='Картинка')),
+                ('image_width', models.PositiveIntegerField(null=True, verbose_name='Ширина картинки')),
+                ('image_height', models.PositiveIntegerField(null=True, verbose_name='Высота картинки')),
+                ('image_placeholder', models.TextField(blank=True, verbose_name='Заглушка картинки')),
+                ('thumbnail_url', models.CharField(blank=True, help_text='Основной вариант карточки, пусто — пока его нет', max_length=300, verbose_name='Миниатюра')),
+                ('thumbnail_srcset', models.TextField(blank=True, help_text='JSON: формат -> srcset', verbose_name='Варианты миниатюры')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Число комментариев')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Карточка поста',
+                'verbose_name_plural': 'Карточки постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['author', '-pub_date', '-post'], name='card_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['group', '-pub_date', '-post'], name='card_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['-pub_date', '-post'], name='card_pub_date_idx'),
+        ),
+        migrations.RunPython(fill_cards, migrations.RunPython.noop),
+    ]
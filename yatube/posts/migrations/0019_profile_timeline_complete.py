@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_heavy(apps, schema_editor):
+    # Посты авторов выше порога в ленты не раскладывались.
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_complete=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_card'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_complete',
+            field=models.BooleanField(default=True, help_text='Снимается, когда подписчиков больше TIMELINE_FANOUT_LIMIT; до дозаполнения лент посты автора подмешиваются при чтении', verbose_name='Посты разложены по лентам'),
+        ),
+        migrations.RunPython(mark_heavy, migrations.RunPython.noop),
+    ]
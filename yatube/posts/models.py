@@ -1,10 +1,45 @@
+import json
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
+class Profile(models.Model):
+    """Счётчики пользователя, обновляемые при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='profile'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+        db_index=True
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    timeline_complete = models.BooleanField(
+        'Посты разложены по лентам',
+        default=True,
+        help_text='Снимается, когда подписчиков больше '
+                  'TIMELINE_FANOUT_LIMIT; до дозаполнения лент '
+                  'посты автора подмешиваются при чтении'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -20,6 +55,8 @@ class Group(models.Model):
 
 
 class Post(models.Model):
+    COUNTERS = ('comments_count',)
+
     text = models.TextField(verbose_name='Текст')
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
@@ -40,17 +77,68 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Размытая миниатюра карточки в виде data URI'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.SLICE_FOR_POST]
 
+    def save(self, *args, **kwargs):
+        """Обычное сохранение не пишет счётчики.
+
+        Их меняют только атомарные F()-обновления из counters.py, так
+        что устаревшее значение в памяти не затирает их.
+        """
+        if (self._state.adding or kwargs.get('force_insert')
+                or kwargs.get('update_fields') is not None):
+            return super().save(*args, **kwargs)
+        kwargs['update_fields'] = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.COUNTERS
+        ]
+        return super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -77,6 +165,16 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+            models.Index(
+                fields=['-created', '-id'],
+                name='comment_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.SLICE_FOR_POST]
@@ -99,3 +197,155 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: строка на пару читатель-пост."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор поста',
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class PostCard(models.Model):
+    """Карточка поста для лент: всё, что нужно для показа, без join.
+
+    Проекцию ведут сигналы постов, авторов и групп, заполняет команда
+    rebuild_cards, сверяет с исходными таблицами check_cards.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пост',
+        related_name='card'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+'
+    )
+    author_username = models.CharField('Имя пользователя', max_length=150)
+    author_full_name = models.CharField(
+        'Полное имя автора',
+        max_length=300,
+        blank=True
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Группа',
+        related_name='+'
+    )
+    group_slug = models.CharField('Slug группы', max_length=100, blank=True)
+    group_title = models.CharField(
+        'Название группы',
+        max_length=200,
+        blank=True
+    )
+    excerpt = models.TextField('Начало текста')
+    image = models.CharField('Картинка', max_length=100, blank=True)
+    image_width = models.PositiveIntegerField('Ширина картинки', null=True)
+    image_height = models.PositiveIntegerField('Высота картинки', null=True)
+    image_placeholder = models.TextField('Заглушка картинки', blank=True)
+    thumbnail_url = models.CharField(
+        'Миниатюра',
+        max_length=300,
+        blank=True,
+        help_text='Основной вариант карточки, пусто — пока его нет'
+    )
+    thumbnail_srcset = models.TextField(
+        'Варианты миниатюры',
+        blank=True,
+        help_text='JSON: формат -> srcset'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Карточка поста'
+        verbose_name_plural = 'Карточки постов'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-post'],
+                name='card_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-post'],
+                name='card_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-post'],
+                name='card_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.excerpt[:settings.SLICE_FOR_POST]
+
+    def as_post(self):
+        """Несохранённый Post для шаблонов ленты; text — начало поста."""
+        post = Post(
+            pk=self.post_id,
+            text=self.excerpt,
+            pub_date=self.pub_date,
+            image=self.image,
+            image_width=self.image_width,
+            image_height=self.image_height,
+            image_placeholder=self.image_placeholder,
+            comments_count=self.comments_count,
+        )
+        # Полное имя целиком в first_name: get_full_name() вернёт его.
+        post.author = User(
+            pk=self.author_id,
+            username=self.author_username,
+            first_name=self.author_full_name
+        )
+        post.group = Group(
+            pk=self.group_id, slug=self.group_slug, title=self.group_title
+        ) if self.group_id else None
+        if self.image:
+            post.card_image_url = self.thumbnail_url or post.image.url
+            post.card_srcset = json.loads(self.thumbnail_srcset or '{}')
+        return post
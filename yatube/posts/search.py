@@ -0,0 +1,135 @@
+"""Полнотекстовый поиск постов по индексу SQLite FTS5.
+
+Строка индекса — пост (rowid = Post.pk) с текстом, названием группы
+и именем автора. Индекс обновляют сигналы, заполняет команда
+reindex_search.
+"""
+import base64
+import binascii
+import functools
+import json
+import re
+
+from django.db import connection
+
+TABLE = 'posts_post_search'
+WORD = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'sqlite' and _has_fts5()
+
+
+@functools.lru_cache(maxsize=None)
+def _has_fts5():
+    # Не во всех сборках SQLite есть FTS5: без него нет и индекса.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе MATCH: все слова, по префиксу.
+
+    Слова из \\w не содержат кавычек и операторов FTS5, так что
+    любой ввод даёт корректное выражение.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query.lower()))
+
+
+def author_name(user):
+    return ' '.join(filter(None, (user.username, user.get_full_name())))
+
+
+def index_posts(posts):
+    """Добавляет или обновляет посты в индексе; author и group загружены."""
+    rows = [
+        (post.pk, post.text, post.group.title if post.group_id else '',
+         author_name(post.author))
+        for post in posts
+    ]
+    # Построчно: executemany под DEBUG зависит от того, как версия
+    # Django логирует пачки параметров.
+    with connection.cursor() as cursor:
+        for row in rows:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', row[:1])
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, text, group_title, author_name) '
+                'VALUES (%s, %s, %s, %s)',
+                row
+            )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rename_group(group):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET group_title = %s WHERE rowid IN '
+            '(SELECT id FROM posts_post WHERE group_id = %s)',
+            [group.title, group.pk]
+        )
+
+
+def rename_author(user):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET author_name = %s WHERE rowid IN '
+            '(SELECT id FROM posts_post WHERE author_id = %s)',
+            [author_name(user), user.pk]
+        )
+
+
+def clear():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def matching_ids_sql(query):
+    """SQL и параметры подзапроса id всех совпавших постов."""
+    return (
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_expression(query)]
+    )
+
+
+def encode_cursor(rank, pk):
+    return base64.urlsafe_b64encode(
+        json.dumps([rank, pk]).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        rank, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return float(rank), int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        return None
+
+
+def search(query, cursor=None, limit=10):
+    """id постов по убыванию релевантности и курсор следующей страницы.
+
+    Страницы листаются по ключу (rank, rowid), без OFFSET.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return [], None
+    sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [expression]
+    if cursor is not None:
+        rank, pk = cursor
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [rank, rank, pk]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return [pk for pk, rank in rows], next_cursor
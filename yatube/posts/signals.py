@@ -0,0 +1,250 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.generations import bump as bump_generation
+from . import cards
+from .counters import bump, bump_comments
+from .feeds import is_pushed, mark_heavy, push_author_posts
+from .images import describe
+from . import search
+from .models import Comment, Follow, Group, Post, Profile, Timeline, User
+from .thumbnails import queue_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if not created or not is_pushed(instance.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post=instance,
+                  author_id=instance.author_id, pub_date=instance.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Дозаполняет ленту постами автора, на которого подписались."""
+    if not created or not is_pushed(instance.author_id):
+        return
+    push_author_posts(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    """Убирает из ленты посты автора, от которого отписались."""
+    Timeline.objects.filter(
+        user_id=instance.user_id, author_id=instance.author_id
+    ).delete()
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    bump(instance.author_id, posts_count=-1)
+
+
+def refresh_counters(comment):
+    """Перечитывает счётчики загруженного поста после F()-обновления."""
+    if Comment.post.is_cached(comment):
+        comment.post.refresh_from_db(fields=Post.COUNTERS)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        bump_comments(instance.post_id, 1)
+        refresh_counters(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    bump_comments(instance.post_id, -1)
+    refresh_counters(instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, followers_count=1)
+        bump(instance.user_id, following_count=1)
+        mark_heavy(Profile.objects.filter(user_id=instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    bump(instance.author_id, followers_count=-1)
+    bump(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_follow_feeds(sender, instance, **kwargs):
+    """Сбрасывает кеш лент подписок, в которых виден пост."""
+    if not is_pushed(instance.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True)
+    bump_generation(*(f'follow:{user_id}' for user_id in followers))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_feed(sender, instance, **kwargs):
+    bump_generation(
+        f'follow:{instance.user_id}', f'followers:{instance.author_id}'
+    )
+
+
+@receiver(post_init, sender=Post)
+def remember_saved(sender, instance, **kwargs):
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    image = instance.__dict__.get('image')
+    instance._saved_image = getattr(image, 'name', image)
+
+
+@receiver(pre_save, sender=Post)
+def describe_image(sender, instance, update_fields=None, **kwargs):
+    """Размеры и заглушка картинки — на любом пути записи поста."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    image = instance.image
+    if not image:
+        instance.image_width = instance.image_height = None
+        instance.image_placeholder = ''
+        return
+    if (image.name == instance._saved_image
+            and instance.image_width is not None):
+        return
+    # Загрузка ещё не записана и открыта; файл из хранилища закрываем.
+    close = image.closed
+    try:
+        image.open('rb')
+        (instance.image_width, instance.image_height,
+         instance.image_placeholder) = describe(image.file)
+    except (OSError, SuspiciousFileOperation):
+        logger.warning('Не прочитать картинку %s', image.name, exc_info=True)
+    finally:
+        if close:
+            image.close()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_generations(sender, instance, **kwargs):
+    """Сбрасывает кеш главной, групп и профиля, где виден пост."""
+    group_ids = {instance.group_id, instance._saved_group_id} - {None}
+    bump_generation(
+        'index',
+        f'author:{instance.author_id}',
+        f'post:{instance.pk}',
+        *(f'group:{group_id}' for group_id in group_ids)
+    )
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_generation(sender, instance, **kwargs):
+    bump_generation(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_generation(sender, instance, **kwargs):
+    bump_generation(f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def make_thumbnails(sender, instance, **kwargs):
+    """Заказывает миниатюры новой картинки, не дожидаясь первого показа."""
+    name = instance.image.name
+    if name and name != instance._saved_image:
+        queue_thumbnails(name)
+    instance._saved_image = name
+
+
+@receiver(post_save, sender=Post)
+def write_card(sender, instance, **kwargs):
+    """Переписывает карточку поста; миниатюры к этому моменту заказаны."""
+    cards.save_cards([instance])
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    if search.is_supported():
+        search.index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    if search.is_supported():
+        search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_title(sender, instance, created, **kwargs):
+    if created:
+        return
+    bump_generation(*cards.rename_group(instance))
+    if search.is_supported():
+        search.rename_group(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def detach_group_cards(sender, instance, **kwargs):
+    """Убирает группу из карточек до того, как у постов её обнулят."""
+    bump_generation(*cards.detach_group(instance))
+
+
+def author_names(user):
+    return tuple(
+        user.__dict__.get(field)
+        for field in ('username', 'first_name', 'last_name')
+    )
+
+
+@receiver(post_init, sender=User)
+def remember_names(sender, instance, **kwargs):
+    instance._saved_names = author_names(instance)
+
+
+@receiver(post_save, sender=User)
+def reindex_author_name(sender, instance, created, **kwargs):
+    """Переписывает карточки и индекс, только если имя изменилось.
+
+    Смена пароля или last_login сохраняет пользователя целиком.
+    """
+    saved, names = instance._saved_names, author_names(instance)
+    instance._saved_names = names
+    if created or names == saved:
+        return
+    bump_generation(*cards.rename_author(instance))
+    if search.is_supported():
+        search.rename_author(instance)
@@ -0,0 +1,36 @@
+from django import template
+
+from ..thumbnails import CARD, CARD_SIZES, prefetch_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_card_images(posts):
+    """Загружает URL миниатюр всех постов страницы одним запросом."""
+    prefetch_thumbnails(posts)
+    return ''
+
+
+@register.inclusion_tag('posts/includes/card_image.html')
+def card_image(post):
+    """Картинка карточки с srcset по готовым вариантам.
+
+    Миниатюры здесь никогда не генерируются, их заказывает сигнал
+    при сохранении поста; пока их нет, показывается оригинал.
+    Размеры и заглушка известны заранее, так что место под картинку
+    занято до её загрузки.
+    """
+    prefetch_thumbnails([post])
+    if post.card_srcset:
+        width, height = map(int, CARD[0].split('x'))
+    else:
+        width, height = post.image_width, post.image_height
+    return {
+        'src': post.card_image_url,
+        'srcset': post.card_srcset,
+        'sizes': CARD_SIZES,
+        'width': width,
+        'height': height,
+        'placeholder': post.image_placeholder,
+    }
@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        for i in range(number):
+            post = Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}')
+            Comment.objects.create(
+                post=post, author=self.author, text=f'Комментарий {i}')
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{post.pk}'),
+                author=self.author)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_rows(2)
+        before = {
+            model: self.changelist_queries(model)
+            for model in ('post', 'comment', 'follow', 'group')
+        }
+        self.add_rows(5)
+        cache.clear()
+        for model, queries in before.items():
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), queries)
+
+    def test_group_is_editable_from_changelist(self):
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url)
+        self.assertContains(
+            response, f'<option value="{self.group.pk}" selected>Группа')
+        response = self.client.post(url, {
+            'form-TOTAL_FORMS': 1,
+            'form-INITIAL_FORMS': 1,
+            'form-0-id': post.pk,
+            'form-0-group': other.pk,
+            '_save': 'Сохранить',
+        })
+        self.assertRedirects(response, url)
+        post.refresh_from_db()
+        self.assertEqual(post.group, other)
+
+    def test_admin_upload_gets_size_and_placeholder(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = BytesIO()
+        Image.new('RGB', (30, 10), 'green').save(buffer, 'PNG')
+        with self.settings(MEDIA_ROOT=media_root):
+            response = self.client.post(reverse('admin:posts_post_add'), {
+                'text': 'Из админки',
+                'author': self.author.pk,
+                'group': self.group.pk,
+                'image': SimpleUploadedFile(
+                    'admin.png', buffer.getvalue(), 'image/png'),
+            })
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(text='Из админки')
+        self.assertEqual((post.image_width, post.image_height), (30, 10))
+        self.assertTrue(post.image_placeholder.startswith('data:image/jpeg'))
+
+    def test_unfiltered_count_is_estimated_from_statistics(self):
+        self.add_rows(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_rows(2)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+        response = self.client.get(url, {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 5)
@@ -0,0 +1,144 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, PostCard, User
+
+
+class PostCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='writer', first_name='Анна', last_name='Писарева')
+        self.group = Group.objects.create(
+            title='Проза', slug='prose', description='Описание')
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Слово ' * 200)
+
+    def card(self):
+        return PostCard.objects.get(pk=self.post.pk)
+
+    def test_card_follows_posts_authors_groups_and_comments(self):
+        card = self.card()
+        self.assertEqual(
+            (card.author_username, card.author_full_name),
+            ('writer', 'Анна Писарева'))
+        self.assertEqual((card.group_slug, card.group_title),
+                         ('prose', 'Проза'))
+        self.assertEqual(len(card.excerpt), settings.POST_EXCERPT_LENGTH)
+        self.post.text = 'Короче'
+        self.post.save()
+        self.author.username = 'novelist'
+        self.author.save()
+        self.group.title = 'Стихи'
+        self.group.save()
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        card = self.card()
+        self.assertEqual(
+            (card.excerpt, card.author_username, card.group_title,
+             card.comments_count),
+            ('Короче', 'novelist', 'Стихи', 1))
+        self.group.delete()
+        card = self.card()
+        self.assertEqual(
+            (card.group_id, card.group_slug, card.group_title),
+            (None, '', ''))
+
+    def test_renames_reach_cached_feeds(self):
+        profile_url = reverse('posts:profile', kwargs={'username': 'writer'})
+        self.assertContains(self.client.get(profile_url), 'Анна Писарева')
+        response = self.client.get('/')
+        self.assertContains(response, 'Автор: writer')
+        self.assertContains(response, '/group/prose/')
+        self.author.first_name = 'Мария'
+        self.author.save()
+        self.assertContains(self.client.get(profile_url), 'Мария Писарева')
+        self.author.username = 'novelist'
+        self.author.save()
+        self.group.slug = 'novels'
+        self.group.save()
+        response = self.client.get('/')
+        self.assertContains(response, 'Автор: novelist')
+        self.assertContains(response, '/group/novels/')
+        self.assertNotContains(response, '/group/prose/')
+        self.group.delete()
+        self.assertNotContains(self.client.get('/'), '/group/novels/')
+
+    def test_renames_reach_follow_feed(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertContains(self.client.get(url), '/group/prose/')
+        self.author.username = 'novelist'
+        self.author.save()
+        self.assertContains(self.client.get(url), 'Автор: novelist')
+        self.group.slug = 'novels'
+        self.group.save()
+        response = self.client.get(url)
+        self.assertContains(response, '/group/novels/')
+        self.assertNotContains(response, '/group/prose/')
+        self.group.delete()
+        self.assertNotContains(self.client.get(url), '/group/novels/')
+
+    @override_settings(PAGE_CACHE_TTL=0)
+    def test_feeds_read_only_cards(self):
+        urls = (
+            reverse('posts:posts_list'),
+            reverse('posts:group_list', kwargs={'slug': 'prose'}),
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:index_fragment'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, self.card().excerpt)
+                self.assertContains(response, reverse(
+                    'posts:post_detail', kwargs={'post_id': self.post.pk}))
+                self.assertFalse(any(
+                    '"posts_post"' in query['sql']
+                    for query in queries.captured_queries))
+
+    def test_repairs_reach_cached_pages(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        follower = Client()
+        follower.force_login(reader)
+        urls = ('/', reverse('posts:group_list', kwargs={'slug': 'prose'}))
+        for command, text in (('check_cards', 'Тихая правка'),
+                              ('rebuild_cards', 'Ещё одна правка')):
+            with self.subTest(command=command):
+                for url in urls:
+                    self.client.get(url)
+                follower.get(reverse('posts:follow_index'))
+                Post.objects.filter(pk=self.post.pk).update(text=text)
+                self.assertNotContains(self.client.get('/'), text)
+                args = ('--fix',) if command == 'check_cards' else ()
+                call_command(command, *args, stdout=StringIO())
+                for url in urls:
+                    self.assertContains(self.client.get(url), text)
+                self.assertContains(
+                    follower.get(reverse('posts:follow_index')), text)
+
+    def test_check_and_rebuild_commands(self):
+        Post.objects.bulk_create(
+            [Post(author=self.author, text='Без карточки')])
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        with self.assertRaisesMessage(
+                CommandError, 'без карточки: 1, устаревших: 1'):
+            call_command('check_cards', stdout=StringIO())
+        call_command('check_cards', '--fix', stdout=StringIO())
+        call_command('check_cards', stdout=StringIO())
+        self.assertEqual(self.card().excerpt, 'Тихая правка')
+        PostCard.objects.all().delete()
+        call_command('rebuild_cards', stdout=StringIO())
+        self.assertEqual(PostCard.objects.count(), 2)
+        call_command('check_cards', stdout=StringIO())
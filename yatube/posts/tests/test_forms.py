@@ -1,17 +1,43 @@
+import base64
+import hashlib
+import os
 import shutil
 import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 from http import HTTPStatus
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageChops
+
+from core.storage import is_hashed
 
 from ..forms import PostForm
-from ..models import Comment, Group, Post, User
+from ..images import shrink
+from ..models import Comment, Group, Post, PostCard, User
+from ..thumbnails import (
+    CARD, CARD_WIDTHS, GEOMETRIES, _log_failure, _submit,
+    generate_thumbnails, prefetch_thumbnails, ready_thumbnail
+)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 class PostsFormTests(TestCase):
@@ -206,9 +232,261 @@ class PostContextTests(TestCase):
                             )
         response = self.guest_client.get(reverse('posts:posts_list'))
         last_object = Post.objects.latest('id')
-        last_object.delete()
+        Post.objects.filter(pk=last_object.pk).update(text='Без сигналов')
         response_cache = self.guest_client.get(reverse('posts:posts_list'))
-        cache.clear()
+        last_object.delete()
         response_no_cache = self.guest_client.get(reverse('posts:posts_list'))
         self.assertEqual(response.content, response_cache.content)
         self.assertNotEqual(response.content, response_no_cache.content)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        })
+        return Post.objects.latest('id')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_thumbnail_is_made_on_upload(self):
+        post = self.create_post()
+        thumbnail = ready_thumbnail(post.image.name, *CARD)
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual(list(thumbnail.size), [960, 339])
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, f'src="{thumbnail.url}"')
+        self.assertContains(response, 'loading="lazy"')
+        for width in CARD_WIDTHS:
+            self.assertContains(response, f' {width}w')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_variants_are_generated_once(self):
+        post = self.create_post()
+        names = [
+            ready_thumbnail(post.image.name, geometry, options).name
+            for geometry, options in GEOMETRIES
+        ]
+        self.assertEqual(len(set(names)), len(GEOMETRIES))
+        mtimes = [os.path.getmtime(os.path.join(TEMP_MEDIA_ROOT, name))
+                  for name in names]
+        generate_thumbnails(post.image.name)
+        self.assertEqual(mtimes, [
+            os.path.getmtime(os.path.join(TEMP_MEDIA_ROOT, name))
+            for name in names])
+
+    def test_page_falls_back_to_original_until_thumbnail_is_ready(self):
+        with mock.patch('posts.signals.queue_thumbnails') as queue:
+            post = self.create_post()
+        queue.assert_called_once_with(post.image.name)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertContains(response, 'width="2" height="1"')
+        self.assertContains(response, post.image_placeholder)
+        self.assertIsNone(ready_thumbnail(post.image.name, *CARD))
+
+    def test_card_gets_thumbnails_when_they_are_made(self):
+        with mock.patch('posts.signals.queue_thumbnails'):
+            post = self.create_post()
+        card = PostCard.objects.get(pk=post.pk)
+        self.assertEqual((card.image, card.thumbnail_url),
+                         (post.image.name, ''))
+        self.assertContains(
+            self.client.get(reverse('posts:posts_list')),
+            f'src="{post.image.url}"')
+        generate_thumbnails(post.image.name)
+        thumbnail = ready_thumbnail(post.image.name, *CARD)
+        card.refresh_from_db()
+        self.assertEqual(card.thumbnail_url, thumbnail.url)
+        response = self.client.get(reverse('posts:posts_list'))
+        self.assertContains(response, f'src="{thumbnail.url}"')
+        for width in CARD_WIDTHS:
+            self.assertContains(response, f' {width}w')
+
+    def test_broken_pool_is_recreated_and_failures_logged(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool
+        with mock.patch('posts.thumbnails._pool', broken), \
+                mock.patch('posts.thumbnails.ProcessPoolExecutor') as pool:
+            with self.assertLogs('posts.thumbnails', 'WARNING'):
+                _submit('posts/photo.jpg')
+            broken.shutdown.assert_called_once_with(wait=False)
+            self.assertEqual(
+                pool.return_value.submit.call_count, len(GEOMETRIES))
+        future = Future()
+        future.set_exception(MemoryError())
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            _log_failure(future)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_feed_thumbnails_are_prefetched_in_one_query(self):
+        for _ in range(3):
+            self.create_post()
+        Post.objects.create(author=self.user, text='Без картинки')
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts)
+        fresh = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(fresh)
+        for post in posts:
+            with self.subTest(post=post.pk):
+                if post.image:
+                    self.assertEqual(
+                        post.card_image_url,
+                        ready_thumbnail(post.image.name, *CARD).url)
+                else:
+                    self.assertFalse(hasattr(post, 'card_image_url'))
+
+
+class ImageIngestTests(TestCase):
+    def make_upload(self, size, fmt='JPEG', mode='RGB', orientation=None):
+        buffer = BytesIO()
+        image = Image.new(mode, size, 'red')
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        image.save(buffer, fmt, exif=exif.tobytes())
+        return SimpleUploadedFile(
+            f'photo.{fmt.lower()}', buffer.getvalue(),
+            content_type=f'image/{fmt.lower()}')
+
+    def clean(self, upload):
+        form = PostForm({'text': 'Фото'}, {'image': upload})
+        form.is_valid()
+        return form
+
+    @override_settings(IMAGE_MASTER_SIZE=100)
+    def test_master_is_bounded_rotated_and_progressive(self):
+        form = self.clean(self.make_upload((400, 200), orientation=6))
+        master = form.cleaned_data['image']
+        self.assertEqual(master.name, 'photo.jpg')
+        with Image.open(master) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertTrue(image.info.get('progressive'))
+            self.assertNotIn(0x0112, image.getexif())
+        self.assertEqual((master.width, master.height), (50, 100))
+        post = form.save(commit=False)
+        post.author = User.objects.create_user(username='photographer')
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=TEMP_MEDIA_ROOT):
+            post.save()
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        header, data = post.image_placeholder.split(',')
+        self.assertEqual(header, 'data:image/jpeg;base64')
+        with Image.open(BytesIO(base64.b64decode(data))) as image:
+            self.assertEqual(image.size, (32, 11))
+
+    def test_shrink_in_bands_matches_resize(self):
+        source = Image.linear_gradient('L').resize((700, 1000))
+        opaque = Image.merge('RGB', [source.rotate(90 * i) for i in range(3)])
+        transparent = opaque.copy()
+        transparent.putalpha(128)
+        # Границы полос дробные: расхождение — в округлении, у RGBA
+        # оно удваивается делением на альфу.
+        for image, tolerance in ((opaque, 1), (transparent, 2)):
+            with self.subTest(mode=image.mode):
+                expected = image.resize((210, 300), Image.LANCZOS)
+                result = shrink(image, 300)
+                self.assertEqual(result.mode, image.mode)
+                difference = ImageChops.difference(result, expected)
+                self.assertLessEqual(max(
+                    high for low, high in difference.getextrema()), tolerance)
+
+    @override_settings(IMAGE_MASTER_SIZE=100)
+    def test_transparent_image_stays_png(self):
+        form = self.clean(self.make_upload((300, 300), 'PNG', 'RGBA'))
+        master = form.cleaned_data['image']
+        self.assertEqual(master.name, 'photo.png')
+        with Image.open(master) as image:
+            self.assertEqual(image.size, (100, 100))
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_limits_are_enforced(self):
+        size = self.make_upload((400, 200)).size
+        with override_settings(IMAGE_MAX_PIXELS=400 * 200 - 1):
+            form = self.clean(self.make_upload((400, 200)))
+            self.assertIn('image', form.errors)
+        with override_settings(IMAGE_MAX_BYTES=size - 1):
+            form = self.clean(self.make_upload((400, 200)))
+            self.assertIn('image', form.errors)
+        form = self.clean(self.make_upload((400, 200)))
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_identical_uploads_share_one_sharded_file(self):
+        posts = [
+            Post.objects.create(
+                author=self.user, text=f'Копия {i}',
+                image=SimpleUploadedFile(f'copy{i}.gif', SMALL_GIF))
+            for i in range(2)
+        ]
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        expected = f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
+        self.assertEqual(
+            [post.image.name for post in posts], [expected, expected])
+        self.assertEqual(os.listdir(os.path.join(
+            TEMP_MEDIA_ROOT, 'posts', digest[:2], digest[2:4])),
+            [f'{digest}.gif'])
+
+    def test_describe_images_backfills_posts_without_size(self):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new('RGB', (40, 20), 'blue').save(
+            buffer, 'JPEG', exif=exif.tobytes())
+        flat = FileSystemStorage().save(
+            'posts/old.jpg', ContentFile(buffer.getvalue()))
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.filter(pk=post.pk).update(image=flat)
+        call_command('describe_images', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (20, 40))
+        self.assertTrue(post.image_placeholder.startswith('data:image/jpeg'))
+        card = PostCard.objects.get(pk=post.pk)
+        self.assertEqual(
+            (card.image_width, card.image_placeholder),
+            (20, post.image_placeholder))
+
+    def test_shard_media_moves_flat_files(self):
+        flat = FileSystemStorage().save(
+            'posts/flat.gif', ContentFile(SMALL_GIF))
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.filter(pk=post.pk).update(image=flat)
+        call_command('shard_media', '--delete', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(is_hashed(post.image.name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertFalse(post.image.storage.exists(flat))
@@ -0,0 +1,119 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='gardener', first_name='Иван', last_name='Садовник')
+        cls.group = Group.objects.create(
+            title='Огороды', slug='gardens', description='Описание')
+        cls.tomatoes = Post.objects.create(
+            author=cls.author, text='Сажаем помидоры в теплице')
+        cls.cucumbers = Post.objects.create(
+            author=cls.author, group=cls.group, text='Огурцы любят воду')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response, [post.pk for post in response.context['page_obj']]
+
+    def test_finds_by_text_group_and_author(self):
+        self.assertEqual(self.search('помидор')[1], [self.tomatoes.pk])
+        self.assertEqual(self.search('огороды')[1], [self.cucumbers.pk])
+        self.assertEqual(
+            sorted(self.search('Садовник')[1]),
+            [self.tomatoes.pk, self.cucumbers.pk])
+        self.assertEqual(self.search('"*(')[1], [])
+
+    def test_index_follows_writes(self):
+        self.tomatoes.text = 'Сажаем перцы'
+        self.tomatoes.save()
+        self.assertEqual(self.search('помидор')[1], [])
+        self.assertEqual(self.search('перцы')[1], [self.tomatoes.pk])
+        self.group.title = 'Грядки'
+        self.group.save()
+        self.assertEqual(self.search('грядки')[1], [self.cucumbers.pk])
+        self.author.first_name = 'Пётр'
+        self.author.save()
+        self.assertEqual(len(self.search('пётр')[1]), 2)
+        self.cucumbers.delete()
+        self.assertEqual(self.search('огурцы')[1], [])
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_results_are_keyset_paginated(self):
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'Рассада {i}')
+        response, first = self.search('рассада')
+        cursor = response.context['next_cursor']
+        self.assertEqual(len(first), 2)
+        self.assertContains(response, f'cursor={cursor}')
+        response, second = self.search('рассада', cursor=cursor)
+        self.assertEqual(len(second), 1)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertFalse(set(first) & set(second))
+
+    def test_reindex_command_covers_bulk_created_posts(self):
+        Post.objects.bulk_create([Post(author=self.author, text='Тыквы')])
+        self.assertEqual(self.search('тыквы')[1], [])
+        call_command('reindex_search', '--clear', stdout=StringIO())
+        self.assertEqual(len(self.search('тыквы')[1]), 1)
+        self.assertEqual(len(self.search('садовник')[1]), 3)
+
+    def test_plain_user_saves_skip_reindex(self):
+        with mock.patch('posts.cards.rename_author') as rename:
+            rename.return_value = set()
+            self.author.set_password('новый пароль')
+            self.author.save()
+            self.author.last_login = timezone.now()
+            self.author.save(update_fields=['last_login'])
+            User.objects.get(pk=self.author.pk).save()
+            rename.assert_not_called()
+            self.author.last_name = 'Огородник'
+            self.author.save()
+            rename.assert_called_once_with(self.author)
+        self.assertEqual(len(self.search('огородник')[1]), 2)
+
+    def test_search_without_fts5_is_empty(self):
+        with mock.patch('posts.search.is_supported', return_value=False):
+            response, found = self.search('помидор')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(found, [])
+
+    def test_indexing_survives_query_logging(self):
+        # Под DEBUG курсор Django пишет запросы в лог.
+        with CaptureQueriesContext(connection):
+            post = Post.objects.create(author=self.author, text='Кабачки')
+            call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(self.search('кабачки')[1], [post.pk])
+        self.assertEqual(len(self.search('садовник')[1]), 3)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'огород'})
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.cucumbers.pk])
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'садовник'})
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.tomatoes.pk, self.cucumbers.pk})
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, Timeline, User
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f'{directory}/content.jsonl.gz'
+        call_command('export_content', self.path, stdout=StringIO())
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def import_content(self, *args):
+        call_command('import_content', self.path, '--batch-size', '2',
+                     *args, stdout=StringIO())
+
+    def test_round_trip_restores_content(self):
+        self.import_content()
+        posts = Post.objects.order_by('pk')
+        self.assertEqual(
+            [(post.text, post.pub_date, post.author, post.group)
+             for post in posts],
+            [(post.text, post.pub_date, post.author, post.group)
+             for post in self.posts])
+        post = posts.first()
+        self.assertEqual(post.comments.get().author, self.reader)
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(
+            Timeline.objects.filter(user=self.reader).count(), 3)
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.posts_count, 3)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_interrupted_import_resumes_without_duplicates(self):
+        with mock.patch(
+                'posts.transfer.Importer._save_comment',
+                side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.import_content()
+        self.assertEqual(Post.objects.count(), 3)
+        self.import_content()
+        self.import_content()
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
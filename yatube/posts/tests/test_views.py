@@ -1,18 +1,26 @@
-
 import shutil
 import tempfile
 from datetime import datetime
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.shortcuts import render
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from ..models import Comment, Follow, Group, Post, User
+from core.generations import bump
+from core.pagination import page_window
+
+from .. import cards
+from ..models import Comment, Follow, Group, Post, PostCard, Timeline, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -177,18 +185,34 @@ class PostsViewsTests(TestCase):
 
     def test_index_cache(self):
         """Тест работы кэширования"""
-        Post.objects.create(
+        post = Post.objects.create(
             text='new-post-with-cache',
             author=self.user,
             group=self.group,
         )
         response = self.guest_client.get('/')
         page = response.content.decode()
-        self.assertNotIn('new-post-with-cache', page)
-        cache.clear()
+        self.assertIn('new-post-with-cache', page)
+        Post.objects.filter(pk=post.pk).update(text='updated-without-signal')
         response = self.guest_client.get('/')
         page = response.content.decode()
         self.assertIn('new-post-with-cache', page)
+        post.text = 'edited-post'
+        post.save()
+        for url in ('/', f'/group/{self.group.slug}/',
+                    f'/profile/{self.user.username}/'):
+            with self.subTest(url=url):
+                page = self.guest_client.get(url).content.decode()
+                self.assertIn('edited-post', page)
+
+    def test_group_change_refreshes_old_group_cache(self):
+        post = Post.objects.create(
+            text='moving-post', author=self.user, group=self.group)
+        old_url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.assertContains(self.guest_client.get(old_url), 'moving-post')
+        post.group = self.group1
+        post.save()
+        self.assertNotContains(self.guest_client.get(old_url), 'moving-post')
 
 
 class PaginatorViewsTest(TestCase):
@@ -207,8 +231,13 @@ class PaginatorViewsTest(TestCase):
                      text='Тестовый текст'
                      + str(i)) for i in range(settings.MULTIPLIER)]
         Post.objects.bulk_create(cls.posts)
+        # bulk_create не шлёт сигналов, карточки для лент строим сами.
+        call_command('rebuild_cards', stdout=StringIO())
         cls.guest_client = Client()
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         response = self.guest_client.get(reverse("posts:posts_list"))
         self.assertEqual(len(response.context["page_obj"]),
@@ -233,6 +262,60 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context["page_obj"]), 3, "Не три!")
 
+    def test_cursor_pages_walk_whole_feed(self):
+        url = reverse("posts:posts_list")
+        first_page = self.guest_client.get(url + "?cursor=").context[
+            "page_obj"]
+        self.assertEqual(len(first_page), settings.POSTS_PER_PAGE)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.guest_client.get(
+            url + "?cursor=" + first_page.next_cursor).context["page_obj"]
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            set(first_page) | set(second_page), set(Post.objects.all())
+        )
+        back_page = self.guest_client.get(
+            url + "?cursor=" + second_page.previous_cursor).context[
+            "page_obj"]
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_page_window_is_elided(self):
+        self.assertEqual(
+            page_window(50, 100, on_each_side=2),
+            [1, None, 48, 49, 50, 51, 52, None, 100]
+        )
+        self.assertEqual(page_window(2, 3, on_each_side=2), [1, 2, 3])
+
+    @override_settings(PAGE_CACHE_TTL=0)
+    def test_count_is_cached_until_post_created(self):
+        url = reverse("posts:posts_list")
+        self.guest_client.get(url)
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Без сигнала')] * 10)
+        # Карточки пишем в обход сигналов и без сброса поколений.
+        cards.save_cards(Post.objects.filter(text='Без сигнала'))
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            response.context["page_obj"].paginator.count,
+            settings.MULTIPLIER)
+        Post.objects.create(author=self.user, text='С сигналом')
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            response.context["page_obj"].paginator.count,
+            settings.MULTIPLIER + 11)
+
+    @override_settings(PAGINATION_NUMBERED_PAGES=1)
+    def test_deep_numbered_page_switches_to_cursor(self):
+        response = self.guest_client.get(
+            reverse("posts:group_list", kwargs={"slug": self.group.slug})
+            + "?page=2"
+        )
+        page_obj = response.context["page_obj"]
+        self.assertEqual(page_obj.number, 1)
+        self.assertTrue(page_obj.next_cursor)
+        self.assertContains(response, "?cursor=" + page_obj.next_cursor)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class CommentViewTests(TestCase):
@@ -293,6 +376,46 @@ class CommentViewTests(TestCase):
         )
         self.assertNotContains(response, 'Тестовый комментарий 2')
 
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        for i in range(5):
+            Comment.objects.create(
+                text=f'Комментарий {i}',
+                author=User.objects.create_user(username=f'commenter{i}'),
+                post=self.post)
+        # Валидатор ETag, пост, страница комментариев.
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}))
+            self.assertContains(response, 'commenter4')
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_older_comments_are_loaded_by_cursor(self):
+        comments = [self.comment] + [
+            Comment.objects.create(
+                text=f'Комментарий {i}', author=self.user, post=self.post)
+            for i in range(3)
+        ]
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.context['comments'], comments[2:])
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        self.assertContains(
+            response,
+            f'data-fragment="{url}'
+            f'?before={response.context["comments_cursor"]}"')
+        self.assertContains(response, 'link.dataset.fragment')
+        data = self.guest_client.get(url, {
+            'before': response.context['comments_cursor'],
+            'format': 'json',
+        }).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comment.pk for comment in comments[:2]])
+        self.assertEqual(data['next_cursor'], '')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['comments'], comments[2:])
+        self.assertTrue(response['X-Next-Cursor'])
+
     def test_comment_shown_in_post_deatail(self):
         response = self.autorized_author.get(reverse(
             'posts:post_detail', kwargs={'post_id': self.post.id})
@@ -355,9 +478,422 @@ class FollowViewTests(TestCase):
         posts_new_count = len(response.context['page_obj'])
         self.assertLessEqual(posts_count, posts_new_count)
 
+    def test_follow_feed_cache_is_per_user_and_versioned(self):
+        cache.clear()
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_author)
+        url = reverse('posts:follow_index')
+        self.assertContains(self.autorized_follower.get(url), 'Тестовый текст')
+        self.assertNotContains(
+            self.autorized_author.get(url), 'Тестовый текст')
+        self.post.text = 'Отредактированный текст'
+        self.post.save()
+        self.assertContains(
+            self.autorized_follower.get(url), 'Отредактированный текст')
+        Follow.objects.filter(user=self.user_follower).delete()
+        self.assertNotContains(
+            self.autorized_follower.get(url), 'Отредактированный текст')
+
     def test_not_follow_himself(self):
         self.autorized_follower.get(
             reverse(
                 'posts:profile_follow',
                 kwargs={'username': self.user_follower.username}))
         self.assertEqual(Follow.objects.all().count(), 0)
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=self.user_follower, author=self.user_author)
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        self.autorized_follower.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.user_author.username}))
+        self.assertTrue(Timeline.objects.filter(
+            user=self.user_follower, post=self.post).exists())
+        self.autorized_follower.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.user_author.username}))
+        self.assertFalse(
+            Timeline.objects.filter(user=self.user_follower).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_author,
+        )
+        new_post = Post.objects.create(
+            author=self.user_author, text='Fan-out text')
+        response = self.autorized_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        response = self.autorized_author.get(reverse('posts:follow_index'))
+        self.assertNotIn(new_post, response.context['page_obj'])
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_heavy_author_is_pulled_and_merged(self):
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate(
+                (self.star, self.author, self.star, self.author))
+        ]
+        self.assertFalse(
+            Timeline.objects.filter(author=self.star).exists())
+        self.assertEqual(
+            Timeline.objects.filter(user=self.reader).count(), 2)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), posts[::-1])
+        with self.settings(POSTS_PER_PAGE=3):
+            url = reverse('posts:follow_index') + '?cursor='
+            first = self.client.get(url).context['page_obj']
+            last = self.client.get(
+                url + first.next_cursor).context['page_obj']
+            back = self.client.get(
+                url + last.previous_cursor).context['page_obj']
+        self.assertEqual(list(first) + list(last), posts[::-1])
+        self.assertEqual(list(back), list(first))
+
+    def test_author_below_limit_is_pulled_until_backfilled(self):
+        post = Post.objects.create(author=self.star, text='Звёздный пост')
+        Follow.objects.get(user=self.fan, author=self.star).delete()
+        cache.clear()
+        url = reverse('posts:follow_index')
+        self.assertIn(post, self.client.get(url).context['page_obj'])
+        out = StringIO()
+        call_command('feed_authors', '--backfill', stdout=out)
+        self.assertIn('авторов: 1', out.getvalue())
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists())
+        self.assertIn(post, self.client.get(url).context['page_obj'])
+        fresh = Post.objects.create(author=self.star, text='Новый пост')
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=fresh).exists())
+
+    def test_feed_authors_command_reports_threshold(self):
+        out = StringIO()
+        call_command('feed_authors', stdout=out)
+        self.assertIn('Pull-авторов (выше порога): 1', out.getvalue())
+        self.assertIn('star', out.getvalue())
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted')
+        cls.reader = User.objects.create_user(username='counter')
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(author=self.author, text='Счётчик')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.author.profile.refresh_from_db()
+        self.reader.profile.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.author.profile.posts_count, 1)
+        self.assertEqual(self.author.profile.followers_count, 1)
+        self.assertEqual(self.reader.profile.following_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.reader.profile.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.reader.profile.following_count, 0)
+        post.delete()
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.posts_count, 0)
+
+    def test_saving_stale_post_keeps_counters(self):
+        post = Post.objects.create(author=self.author, text='Счётчик')
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        stale.text = 'Правка'
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.comments_count), ('Правка', 1))
+        self.assertEqual(
+            PostCard.objects.get(pk=post.pk).comments_count, 1)
+
+    def test_plain_save_does_not_reread_counters(self):
+        post = Post.objects.create(author=self.author, text='Счётчик')
+        with mock.patch.object(Post, 'refresh_from_db') as refresh:
+            post.text = 'Правка'
+            post.save()
+        refresh.assert_not_called()
+
+    def test_comment_refreshes_loaded_post(self):
+        post = Post.objects.create(author=self.author, text='Счётчик')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_recount_repairs_drift(self):
+        Post.objects.create(author=self.author, text='Счётчик')
+        self.author.profile.delete()
+        call_command('recount', stdout=StringIO())
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(response.context['author'].profile.posts_count, 1)
+        self.assertContains(response, 'Всего постов: 1')
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='paged')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Кеш', slug='page-cache', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Закешированный')
+        cls.other = Post.objects.create(
+            author=cls.reader, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_page_is_cached_with_surrogate_keys(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertEqual(
+            response['Surrogate-Key'],
+            f'post:{self.post.pk} author:{self.author.pk} '
+            f'group:{self.group.pk}')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIsNotNone(response.context)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, 'Закешированный')
+
+    def test_authenticated_pages_are_not_cached(self):
+        url = reverse('posts:posts_list')
+        self.reader_client.get(url)
+        response = self.reader_client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_comment_purges_only_tagged_pages(self):
+        detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+        other = reverse(
+            'posts:post_detail', kwargs={'post_id': self.other.pk})
+        self.client.get(detail)
+        self.client.get(other)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Свежий комментарий'})
+        response = self.client.get(detail)
+        self.assertContains(response, 'Свежий комментарий')
+        self.assertIsNone(self.client.get(other).context)
+
+    def test_post_edit_purges_feeds(self):
+        urls = [
+            reverse('posts:posts_list'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+        for url in urls:
+            self.client.get(url)
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Отредактированный', 'group': self.group.pk})
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Отредактированный')
+
+    def test_write_during_render_is_not_cached_over(self):
+        url = reverse('posts:posts_list')
+
+        def render_then_write(*args, **kwargs):
+            response = render(*args, **kwargs)
+            Post.objects.create(author=self.author, text='Пока рендерили')
+            return response
+
+        with mock.patch('posts.views.render', side_effect=render_then_write):
+            self.assertNotContains(self.client.get(url), 'Пока рендерили')
+        self.assertContains(self.client.get(url), 'Пока рендерили')
+
+    def test_follow_purges_profile(self):
+        url = reverse(
+            'posts:profile', kwargs={'username': self.author.username})
+        self.client.get(url)
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}))
+        response = self.client.get(url)
+        self.assertEqual(response.context['author'].profile.followers_count, 1)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        cls.urls = {
+            reverse('posts:posts_list'): 1,
+            reverse('posts:group_list', kwargs={'slug': 'group'}): 2,
+            reverse('posts:profile', kwargs={'username': 'author'}): 2,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': cls.post.pk}): 1,
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, client, url, queries):
+        etag = client.get(url)['ETag']
+        with self.assertNumQueries(queries):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertIsNone(response.context)
+        return etag
+
+    @override_settings(PAGE_CACHE_TTL=0)
+    def test_unchanged_pages_answer_304_before_rendering(self):
+        for url, queries in self.urls.items():
+            with self.subTest(url=url):
+                self.revalidate(self.client, url, queries)
+
+    def test_post_page_follows_group_rename(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Group.objects.filter(pk=self.group.pk).update(
+            title='Переименованная')
+        bump(f'group:{self.group.pk}')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Группа: Переименованная')
+
+    def test_page_cache_hit_answers_304_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.revalidate(self.client, url, 0)
+
+    @override_settings(PAGE_CACHE_TTL=0)
+    def test_etag_changes_with_content_and_viewer(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        for url, old in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=old)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(
+                    reader_client.get(url)['ETag'], response['ETag'])
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Карточка {i}')
+            for i in range(5)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.fragments = [
+            reverse('posts:index_fragment'),
+            reverse('posts:group_fragment', kwargs={'slug': 'group'}),
+            reverse('posts:profile_fragment', kwargs={'username': 'author'}),
+            reverse('posts:follow_fragment'),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def walk(self, url):
+        """Тексты карточек всех порций ленты по X-Next-Cursor."""
+        texts = []
+        cursor = ''
+        while True:
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertNotContains(response, '<html')
+            texts += [post.text for post in response.context['page_obj']]
+            cursor = response['X-Next-Cursor']
+            if not cursor:
+                return texts
+
+    def test_fragments_walk_whole_feed(self):
+        expected = [post.text for post in reversed(self.posts)]
+        for url in self.fragments:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), expected)
+
+    def test_feed_page_links_first_fragment(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'group'}))
+        page_obj = response.context['page_obj']
+        self.assertContains(
+            response,
+            f'data-fragment="{self.fragments[1]}'
+            f'?cursor={page_obj.more_cursor}"')
+        self.assertContains(response, 'Карточка 4', count=1)
+        response = self.client.get(
+            self.fragments[1], {'cursor': page_obj.more_cursor})
+        self.assertContains(response, 'Карточка 2')
+        self.assertNotContains(response, 'Карточка 3')
+
+    @override_settings(PAGE_CACHE_TTL=0)
+    def test_fragment_is_cached_per_cursor_until_feed_changes(self):
+        url = self.fragments[0]
+        cursor = self.client.get(url)['X-Next-Cursor']
+        self.client.get(url, {'cursor': cursor})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'cursor': cursor})
+        self.assertIsNone(response.context)
+        Post.objects.create(author=self.author, text='Свежая')
+        response = self.client.get(url)
+        self.assertContains(response, 'Свежая')
+
+    def test_bad_cursor_and_anonymous_follow(self):
+        response = self.client.get(self.fragments[0], {'cursor': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.client.logout()
+        response = self.client.get(self.fragments[3])
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
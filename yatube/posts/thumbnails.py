@@ -0,0 +1,259 @@
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore
+)
+from sorl.thumbnail.models import KVStore
+
+from core.generations import bump
+from .models import Follow, PostCard
+
+# Карточка поста; остальные ширины и WebP отдаются через srcset.
+CARD = ('960x339', {'crop': 'center', 'upscale': True})
+CARD_WIDTHS = (480, 960, 1440)
+CARD_FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+CARD_SIZES = '(min-width: 1200px) 960px, 100vw'
+CARD_DEFAULT = (960, 'JPEG')
+
+
+def _card_variant(width, format):
+    geometry, options = CARD
+    card_width, card_height = map(int, geometry.split('x'))
+    height = round(width * card_height / card_width)
+    return f'{width}x{height}', dict(options, format=format)
+
+
+CARD_VARIANTS = {
+    (width, format): _card_variant(width, format)
+    for format in CARD_FORMATS
+    for width in CARD_WIDTHS
+}
+# Геометрии, в которых шаблоны показывают Post.image.
+GEOMETRIES = tuple(CARD_VARIANTS.values())
+
+_pool = None
+logger = logging.getLogger(__name__)
+
+
+def _thumbnail(name, geometry, options):
+    """Файл миниатюры, который sorl создал бы для name, без генерации."""
+    source = ImageFile(name)
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(thumbnail_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage
+    )
+
+
+def ready_thumbnail(name, geometry, options):
+    """Готовая миниатюра из key-value хранилища sorl или None."""
+    return default.kvstore.get(_thumbnail(name, geometry, options))
+
+
+def _get_many_raw(keys):
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(KVStore.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        fetched = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(fetched)
+    return {
+        key: value for key, value in found.items() if value != EMPTY_VALUE
+    }
+
+
+def ready_variants(names):
+    """Готовые варианты карточек: имя картинки -> {(ширина, формат): URL}.
+
+    Миниатюры всех имён ищутся одним get_many.
+    """
+    names = set(names)
+    keys = {}
+    for name in names:
+        for variant, (geometry, options) in CARD_VARIANTS.items():
+            thumbnail = _thumbnail(name, geometry, options)
+            keys[add_prefix(thumbnail.key)] = (name, variant)
+    ready = {name: {} for name in names}
+    if not keys:
+        return ready
+    found = _get_many_raw(list(keys))
+    for key, (name, variant) in keys.items():
+        if key in found:
+            ready[name][variant] = deserialize_image_file(found[key]).url
+    return ready
+
+
+def card_srcset(variants):
+    """srcset по форматам из готовых вариантов одной картинки."""
+    srcset = {}
+    for width, format in CARD_VARIANTS:
+        url = variants.get((width, format))
+        if url is None:
+            continue
+        srcset[format] = (
+            f'{srcset[format]}, {url} {width}w' if format in srcset
+            else f'{url} {width}w'
+        )
+    return srcset
+
+
+def thumbnail_fields(variants):
+    """Поля миниатюры карточки поста (PostCard) по готовым вариантам."""
+    return {
+        'thumbnail_url': variants.get(CARD_DEFAULT, ''),
+        'thumbnail_srcset': (
+            json.dumps(card_srcset(variants)) if variants else ''),
+    }
+
+
+def refresh_cards(name):
+    """Записывает готовые миниатюры name в карточки постов с ней.
+
+    Сбрасывает кеш страниц этих постов и лент, где они видны, включая
+    ленты подписок: там до сих пор оригинал без srcset.
+    """
+    cards = PostCard.objects.filter(image=name)
+    namespaces = set()
+    authors = set()
+    for post_id, author_id, group_id in cards.values_list(
+            'post_id', 'author_id', 'group_id'):
+        authors.add(author_id)
+        namespaces.update(('index', f'post:{post_id}', f'author:{author_id}'))
+        if group_id:
+            namespaces.add(f'group:{group_id}')
+    cards.update(**thumbnail_fields(ready_variants([name])[name]))
+    # cards импортирует этот модуль, поэтому подписчиков ищем здесь.
+    followers = Follow.objects.filter(
+        author_id__in=authors).values_list('user_id', flat=True)
+    namespaces.update(f'follow:{user_id}' for user_id in set(followers))
+    bump(*namespaces)
+
+
+def prefetch_thumbnails(posts):
+    """Находит готовые варианты карточек для всех posts одним get_many.
+
+    В post.card_image_url попадает основная миниатюра (или оригинал,
+    пока её нет), в post.card_srcset — готовые варианты по форматам.
+    Посты, для которых это уже сделано, пропускаются.
+    """
+    pending = [
+        post for post in posts
+        if post.image and not hasattr(post, 'card_image_url')
+    ]
+    if not pending:
+        return
+    ready = ready_variants(post.image.name for post in pending)
+    for post in pending:
+        variants = ready[post.image.name]
+        post.card_image_url = variants.get(CARD_DEFAULT, post.image.url)
+        post.card_srcset = card_srcset(variants)
+
+
+def generate_thumbnail(name, geometry, options):
+    """Создаёт одну миниатюру и отмечает её в карточках постов.
+
+    Готовую миниатюру sorl находит и не пересоздаёт.
+    """
+    thumbnail = get_thumbnail(name, geometry, **options)
+    refresh_cards(name)
+    return thumbnail
+
+
+def generate_thumbnails(name):
+    """Создаёт миниатюры name во всех GEOMETRIES."""
+    for geometry, options in GEOMETRIES:
+        get_thumbnail(name, geometry, **options)
+    refresh_cards(name)
+
+
+def _close_connections():
+    # Соединения с базой, унаследованные от родителя, не разделяются.
+    connections.close_all()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            initializer=_close_connections
+        )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+    _pool = None
+
+
+def _log_failure(future):
+    if future.cancelled() or future.exception() is None:
+        return
+    logger.error('Миниатюра не создана', exc_info=future.exception())
+
+
+def _submit(name):
+    """Ставит варианты name в пул; ошибки пишет в лог, а не наверх.
+
+    Пул, в котором умер процесс (например, по OOM на большой
+    картинке), больше задач не принимает: он пересоздаётся один раз.
+    Пост к этому моменту сохранён, так что ответ не должен падать.
+    """
+    for geometry, options in GEOMETRIES:
+        for attempt in range(2):
+            try:
+                future = _get_pool().submit(
+                    generate_thumbnail, name, geometry, options)
+            except BrokenProcessPool:
+                logger.warning('Пул миниатюр сломан, создаётся заново')
+                _reset_pool()
+                continue
+            future.add_done_callback(_log_failure)
+            break
+        else:
+            logger.error('Миниатюра %s %s не поставлена в пул', name, geometry)
+
+
+def queue_thumbnails(name):
+    """Ставит варианты миниатюр в пул процессов после коммита.
+
+    Каждый вариант — отдельная задача, так что они создаются
+    параллельно. При THUMBNAIL_WORKERS = 0 или базе в памяти миниатюры
+    создаются сразу, в этом процессе.
+    """
+    # Процессы пула не видят базу SQLite в памяти (тесты).
+    in_memory = (
+        connection.vendor == 'sqlite' and connection.is_in_memory_db()
+    )
+    if not settings.THUMBNAIL_WORKERS or in_memory:
+        generate_thumbnails(name)
+        return
+    transaction.on_commit(lambda: _submit(name))
@@ -0,0 +1,235 @@
+"""Перенос пользователей, групп, постов, комментариев и подписок в JSONL.
+
+Строка файла — одна запись {"model": ..., поля}. Пользователи и группы
+сопоставляются по username и slug. Посты и комментарии сохраняют
+исходные id, сдвинутые на offset, так что повторный импорт пачки
+ничего не дублирует, а ссылки комментариев на посты не нужно
+держать в памяти.
+"""
+import gzip
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from . import cards, search
+from .feeds import is_pushed, push_author_posts
+from .models import Comment, Follow, Group, Post, Timeline, User
+
+USER_FIELDS = {
+    field: field for field in (
+        'username', 'password', 'first_name', 'last_name', 'email',
+        'date_joined',
+    )
+}
+GROUP_FIELDS = {field: field for field in ('slug', 'title', 'description')}
+POST_FIELDS = {
+    'pk': 'pk',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'image_placeholder': 'image_placeholder',
+}
+COMMENT_FIELDS = {
+    'pk': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+FOLLOW_FIELDS = {'user': 'user__username', 'author': 'author__username'}
+
+# Порядок важен: записи ссылаются только на уже прочитанные.
+EXPORTS = (
+    ('user', User, USER_FIELDS),
+    ('group', Group, GROUP_FIELDS),
+    ('post', Post, POST_FIELDS),
+    ('comment', Comment, COMMENT_FIELDS),
+    ('follow', Follow, FOLLOW_FIELDS),
+)
+
+
+def open_stream(path, mode):
+    """Файл в текстовом режиме; имя на .gz — сжатый gzip."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export_records(chunk_size):
+    """Все записи по порядку EXPORTS; в памяти не больше chunk_size строк."""
+    for name, model, fields in EXPORTS:
+        rows = model.objects.order_by('pk').values_list(*fields.values())
+        for row in rows.iterator(chunk_size=chunk_size):
+            record = {'model': name}
+            record.update(zip(fields, row))
+            yield record
+
+
+def _isoformat(value):
+    # DjangoJSONEncoder обрезает микросекунды, а по ним сортируются ленты.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def dump(record):
+    return json.dumps(record, default=_isoformat, ensure_ascii=False)
+
+
+@contextmanager
+def original_dates(model, field_name):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из файла."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _ids(model, field, values):
+    values = set(values) - {None}
+    if not values:
+        return {}
+    return dict(model.objects.filter(
+        **{field + '__in': values}).values_list(field, 'pk'))
+
+
+class Importer:
+    """Пишет пачки записей одной модели через bulk_create.
+
+    Каждый метод возвращает пространства имён кеша, которые надо
+    сбросить после коммита пачки. Записи со ссылкой на отсутствующего
+    пользователя пропускаются и считаются в skipped.
+    """
+
+    def __init__(self, post_offset, comment_offset):
+        self.post_offset = post_offset
+        self.comment_offset = comment_offset
+        self.skipped = 0
+
+    def save(self, model, records):
+        return getattr(self, f'_save_{model}')(records)
+
+    def _save_user(self, records):
+        User.objects.bulk_create(
+            [User(**{field: record[field] for field in USER_FIELDS})
+             for record in records],
+            ignore_conflicts=True,
+        )
+        return set()
+
+    def _save_group(self, records):
+        Group.objects.bulk_create(
+            [Group(**{field: record[field] for field in GROUP_FIELDS})
+             for record in records],
+            ignore_conflicts=True,
+        )
+        return set()
+
+    def _authors(self, records, *fields):
+        return _ids(User, 'username', (
+            record[field] for record in records for field in fields))
+
+    def _save_post(self, records):
+        authors = self._authors(records, 'author')
+        groups = _ids(Group, 'slug', (record['group'] for record in records))
+        posts = []
+        for record in records:
+            if record['author'] not in authors:
+                self.skipped += 1
+                continue
+            posts.append(Post(
+                pk=record['pk'] + self.post_offset,
+                author_id=authors[record['author']],
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                image=record['image'] or '',
+                image_width=record['image_width'],
+                image_height=record['image_height'],
+                image_placeholder=record['image_placeholder'],
+            ))
+        with original_dates(Post, 'pub_date'):
+            Post.objects.bulk_create(posts, ignore_conflicts=True)
+        saved = list(Post.objects.select_related('author', 'group').filter(
+            pk__in=[post.pk for post in posts]))
+        if search.is_supported():
+            search.index_posts(saved)
+        cards.save_cards(saved)
+        namespaces = {'index'}
+        for post in posts:
+            namespaces.add(f'author:{post.author_id}')
+            if post.group_id:
+                namespaces.add(f'group:{post.group_id}')
+        return namespaces | self._fan_out(posts)
+
+    def _fan_out(self, posts):
+        """Раскладывает посты по лентам тех, кто уже подписан на авторов."""
+        by_author = defaultdict(list)
+        for post in posts:
+            if is_pushed(post.author_id):
+                by_author[post.author_id].append(post)
+        followers = Follow.objects.filter(
+            author_id__in=by_author).values_list('user_id', 'author_id')
+        namespaces = set()
+        entries = []
+        for user_id, author_id in followers.iterator():
+            namespaces.add(f'follow:{user_id}')
+            entries.extend(
+                Timeline(user_id=user_id, post_id=post.pk,
+                         author_id=author_id, pub_date=post.pub_date)
+                for post in by_author[author_id]
+            )
+            if len(entries) >= settings.TIMELINE_BATCH_SIZE:
+                Timeline.objects.bulk_create(entries, ignore_conflicts=True)
+                entries = []
+        Timeline.objects.bulk_create(entries, ignore_conflicts=True)
+        return namespaces
+
+    def _save_comment(self, records):
+        authors = self._authors(records, 'author')
+        comments = []
+        for record in records:
+            if record['author'] not in authors:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                pk=record['pk'] + self.comment_offset,
+                post_id=record['post'] + self.post_offset,
+                author_id=authors[record['author']],
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            ))
+        with original_dates(Comment, 'created'):
+            Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        return {f'post:{comment.post_id}' for comment in comments}
+
+    def _save_follow(self, records):
+        users = self._authors(records, 'user', 'author')
+        pairs = set()
+        for record in records:
+            user_id = users.get(record['user'])
+            author_id = users.get(record['author'])
+            if user_id is None or author_id is None:
+                self.skipped += 1
+            elif user_id != author_id:
+                pairs.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs],
+            ignore_conflicts=True,
+        )
+        namespaces = set()
+        for user_id, author_id in pairs:
+            if is_pushed(author_id):
+                push_author_posts(user_id, author_id)
+            namespaces.update((f'follow:{user_id}', f'followers:{author_id}'))
+        return namespaces
@@ -9,18 +9,34 @@ urlpatterns = [
         '',
         views.index,
         name='posts_list'),
+    path(
+        'fragments/posts/',
+        views.index_fragment,
+        name='index_fragment'),
     path(
         'group/<slug:slug>/',
         views.group_posts,
         name='group_list'),
+    path(
+        'group/<slug:slug>/fragment/',
+        views.group_fragment,
+        name='group_fragment'),
     path(
         'profile/<str:username>/',
         views.profile,
         name='profile'),
+    path(
+        'profile/<str:username>/fragment/',
+        views.profile_fragment,
+        name='profile_fragment'),
     path(
         'posts/<int:post_id>/',
         views.post_detail,
         name='post_detail'),
+    path(
+        'search/',
+        views.search,
+        name='search'),
     path(
         'create/',
         views.post_create,
@@ -29,6 +45,10 @@ urlpatterns = [
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'),
     path(
         'posts/<int:post_id>/edit/',
         views.post_edit,
@@ -37,6 +57,10 @@ urlpatterns = [
         'follow/',
         views.follow_index,
         name='follow_index'),
+    path(
+        'follow/fragment/',
+        views.follow_fragment,
+        name='follow_fragment'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
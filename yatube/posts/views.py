@@ -1,33 +1,130 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.views.decorators.http import etag
 
-from core.pagination import pagination
+from core.generations import generation_key
+from core.page_cache import set_surrogate_keys
+from core.pagination import CursorPaginator, decode_cursor, pagination
+from . import search as post_search
+from .cards import CardFeed
+from .feeds import FollowFeed
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow, User
+from .models import Comment, Group, Post, PostCard, Follow, User
+
+
+def page_etag(request, namespaces, *data):
+    """ETag страницы: поколения её суррогатных ключей, данные и зритель.
+
+    Поколения сдвигают сигналы, данные ловят записи в обход сигналов
+    (update(), bulk_create). Last-Modified не отдаём: правка поста
+    не двигает ни одной даты, и If-Modified-Since дал бы ложный 304.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else ''
+    raw = ':'.join(
+        str(part) for part in (generation_key(*namespaces), viewer, *data)
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _latest(cards):
+    return cards.order_by('-pub_date', '-post_id').values_list(
+        'post_id', 'pub_date').first()
+
+
+def index_etag(request):
+    return page_etag(request, ('index',), _latest(PostCard.objects.all()))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return page_etag(request, (f'group:{group_id}',),
+                     _latest(PostCard.objects.filter(group_id=group_id)))
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    return page_etag(
+        request, (f'author:{author_id}', f'followers:{author_id}'),
+        _latest(PostCard.objects.filter(author_id=author_id))
+    )
+
+
+def post_namespaces(post_id, author_id, group_id):
+    """Пространства имён страницы поста: сам пост, автор и группа."""
+    namespaces = [f'post:{post_id}', f'author:{author_id}']
+    if group_id:
+        namespaces.append(f'group:{group_id}')
+    return namespaces
+
 
+def post_etag(request, post_id):
+    last_comment = Comment.objects.filter(
+        post=OuterRef('pk')).order_by('-created').values('created')[:1]
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id', 'pub_date', Subquery(last_comment)).first()
+    if post is None:
+        return None
+    author_id, group_id, *dates = post
+    return page_etag(request, post_namespaces(post_id, author_id, group_id),
+                     *dates)
 
+
+@etag(index_etag)
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = pagination(request, post_list)
-    return render(request, 'posts/index.html', {
+    generation = generation_key('index')
+    page_obj = pagination(
+        request, CardFeed(), count_key=f'index:{generation}')
+    response = render(request, 'posts/index.html', {
         'page_obj': page_obj,
+        'generation': generation,
+        'cache_ttl': settings.FEED_CACHE_TTL,
     })
+    return set_surrogate_keys(response, 'index', generation=generation)
 
 
+@etag(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = pagination(request, posts)
-    return render(request, 'posts/group_list.html', {
+    generation = generation_key(f'group:{group.pk}')
+    posts = CardFeed(PostCard.objects.filter(group_id=group.pk))
+    page_obj = pagination(
+        request, posts, count_key=f'group:{group.pk}:{generation}'
+    )
+    response = render(request, 'posts/group_list.html', {
         'page_obj': page_obj,
         'group': group,
+        'generation': generation,
+        'cache_ttl': settings.FEED_CACHE_TTL,
     })
+    return set_surrogate_keys(
+        response, f'group:{group.pk}', generation=generation)
 
 
+@etag(profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    page_obj = pagination(request, posts)
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    namespaces = (f'author:{author.pk}', f'followers:{author.pk}')
+    page_generation = generation_key(*namespaces)
+    posts = CardFeed(PostCard.objects.filter(author_id=author.pk))
+    profile = getattr(author, 'profile', None)
+    page_obj = pagination(
+        request, posts, count=profile and profile.posts_count
+    )
     following = (request.user.is_authenticated
                  and Follow.objects.filter(user=request.user, author=author)
                  .exists())
@@ -35,18 +132,147 @@ def profile(request, username):
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        'generation': generation_key(f'author:{author.pk}'),
+        'cache_ttl': settings.FEED_CACHE_TTL,
     }
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    return set_surrogate_keys(
+        response, *namespaces, generation=page_generation)
+
+
+def feed_fragment(request, name, post_list, generation):
+    """Карточки постов после ?cursor= без страницы вокруг них.
+
+    Следующий курсор — в заголовке X-Next-Cursor, пустой в конце
+    ленты. Пара (html, курсор) кешируется по поколению ленты и курсору.
+    """
+    token = request.GET.get('cursor', '')
+    if token and decode_cursor(token) is None:
+        return HttpResponseBadRequest()
+    key = f'fragment:{name}:{generation}:{token}'
+    fragment = cache.get(key)
+    if fragment is None:
+        page_obj = CursorPaginator(
+            post_list, settings.POSTS_PER_PAGE).get_page(token)
+        fragment = (
+            render_to_string(
+                'posts/includes/posts.html', {'page_obj': page_obj}),
+            page_obj.next_cursor
+        )
+        cache.set(key, fragment, settings.FEED_CACHE_TTL)
+    html, next_cursor = fragment
+    response = HttpResponse(html)
+    response['X-Next-Cursor'] = next_cursor
+    return response
+
 
+def index_fragment(request):
+    generation = generation_key('index')
+    response = feed_fragment(request, 'index', CardFeed(), generation)
+    return set_surrogate_keys(response, 'index', generation=generation)
 
+
+def group_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    generation = generation_key(f'group:{group.pk}')
+    response = feed_fragment(
+        request, f'group:{group.pk}',
+        CardFeed(PostCard.objects.filter(group_id=group.pk)), generation
+    )
+    return set_surrogate_keys(
+        response, f'group:{group.pk}', generation=generation)
+
+
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+    generation = generation_key(f'author:{author.pk}')
+    response = feed_fragment(
+        request, f'author:{author.pk}',
+        CardFeed(PostCard.objects.filter(author_id=author.pk)), generation
+    )
+    return set_surrogate_keys(
+        response, f'author:{author.pk}', generation=generation)
+
+
+@login_required
+def follow_fragment(request):
+    feed = FollowFeed(request.user)
+    return feed_fragment(
+        request, f'follow:{request.user.pk}', feed, feed.generation_key())
+
+
+def comments_page(request, post_id):
+    """Порция комментариев по времени и курсор к более ранним (?before=)."""
+    before = request.GET.get('before')
+    key = 'comments:{}:{}:{}'.format(
+        post_id, generation_key(f'post:{post_id}'), before
+    )
+    chunk = cache.get(key)
+    if chunk is None:
+        paginator = CursorPaginator(
+            Comment.objects.filter(post_id=post_id).select_related('author'),
+            settings.COMMENTS_PER_PAGE,
+            date_field='created'
+        )
+        page = paginator.get_page(before)
+        chunk = page.object_list[::-1], page.next_cursor
+        cache.set(key, chunk, settings.FEED_CACHE_TTL)
+    return chunk
+
+
+@etag(post_etag)
 def post_detail(request, post_id):
     form = CommentForm()
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
-    return render(request, 'posts/post_detail.html', {
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), pk=post_id
+    )
+    namespaces = post_namespaces(post.pk, post.author_id, post.group_id)
+    generation = generation_key(*namespaces)
+    comments, comments_cursor = comments_page(request, post.pk)
+    response = render(request, 'posts/post_detail.html', {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'comments_cursor': comments_cursor,
+    })
+    return set_surrogate_keys(response, *namespaces, generation=generation)
+
+
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments, comments_cursor = comments_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            } for comment in comments],
+            'next_cursor': comments_cursor,
+        })
+    response = render(request, 'posts/includes/comments.html', {
+        'comments': comments,
+    })
+    response['X-Next-Cursor'] = comments_cursor
+    return response
+
+
+def search(request):
+    query = request.GET.get('q', '')
+    ids, next_cursor = [], None
+    # Без FTS5 индекса нет: страница честно пуста, а не падает.
+    if post_search.is_supported():
+        ids, next_cursor = post_search.search(
+            query,
+            post_search.decode_cursor(request.GET.get('cursor', '')),
+            settings.POSTS_PER_PAGE
+        )
+    posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': [posts[pk] for pk in ids if pk in posts],
+        'next_cursor': next_cursor,
     })
 
 
@@ -100,9 +326,16 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(request, posts)
-    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    feed = FollowFeed(request.user)
+    generation = feed.generation_key()
+    page_obj = pagination(
+        request, feed, count_key=f'follow:{request.user.pk}:{generation}'
+    )
+    return render(request, 'posts/follow.html', {
+        'page_obj': page_obj,
+        'generation': generation,
+        'cache_ttl': settings.FEED_CACHE_TTL,
+    })
 
 
 @login_required
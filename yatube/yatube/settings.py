@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.page_cache.AnonymousPageCacheMiddleware',
 ]
 
 INTERNAL_IPS = [
@@ -71,6 +73,23 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+PAGINATION_NUMBERED_PAGES = 5
+PAGINATION_WINDOW = 2
+PAGINATION_COUNT_TTL = 60
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_HEAVY_AUTHORS_TTL = 60 * 5
+FEED_CACHE_TTL = 60 * 60 * 6
+PAGE_CACHE_TTL = 60 * 60
+PAGE_CACHE_MAX_AGE = 60
+THUMBNAIL_WORKERS = 2
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+IMAGE_MASTER_SIZE = 2048
+IMAGE_MASTER_QUALITY = 85
+API_MAX_LIMIT = 100
+POST_EXCERPT_LENGTH = 500
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -148,8 +167,19 @@ MULTIPLIER = 13
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_MAX_AGE = 60 * 60
+# '' — файлы отдаёт само приложение; 'x-accel' — nginx по
+# X-Accel-Redirect на MEDIA_ACCEL_PREFIX; 'x-sendfile' — Apache/lighttpd.
+MEDIA_ACCEL = ''
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+# Тесты чистят кеш, поэтому раннер даёт им свой файл (core.testing).
+TEST_RUNNER = 'core.testing.TestRunner'